@@ -0,0 +1,38 @@
+"""Сравнение двух прогонов замеров: python benchmarks/compare.py a b."""
+import json
+import sys
+
+COLUMNS = ('p50_ms', 'p90_ms', 'queries_median', 'throughput_rps')
+
+
+def load(path):
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
+
+
+def change(old, new):
+    if not old:
+        return ''
+    return f'{(new - old) / old:+.0%}'
+
+
+def main(old_path, new_path):
+    old, new = load(old_path), load(new_path)
+    print(f'{old["commit"]} -> {new["commit"]}')
+    for name in sorted(set(old['scenarios']) | set(new['scenarios'])):
+        before = old['scenarios'].get(name)
+        after = new['scenarios'].get(name)
+        if before is None or after is None:
+            where = 'новом' if before is None else 'старом'
+            print(f'{name}: только в {where} прогоне')
+            continue
+        cells = [f'{column} {before[column]} -> {after[column]} '
+                 f'({change(before[column], after[column])})'
+                 for column in COLUMNS]
+        print(f'{name}: ' + '; '.join(cells))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    main(*sys.argv[1:])
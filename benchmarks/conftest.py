@@ -0,0 +1,172 @@
+"""Нагрузочные замеры приложения posts.
+
+Запуск: python -m pytest benchmarks
+Размер данных и число повторов задаются переменными окружения BENCH_*,
+результаты пишутся в benchmarks/results/<коммит>.json; сравнить два
+прогона: python benchmarks/compare.py old.json new.json
+"""
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import timedelta
+
+import django
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+pytest_plugins = [
+    'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_data',
+]
+
+SEED = 20240601
+SIZES = {
+    'users': int(os.getenv('BENCH_USERS', 300)),
+    'groups': int(os.getenv('BENCH_GROUPS', 20)),
+    'posts': int(os.getenv('BENCH_POSTS', 20000)),
+    'comments': int(os.getenv('BENCH_COMMENTS', 20000)),
+    'hot_post_comments': int(os.getenv('BENCH_HOT_POST_COMMENTS', 3000)),
+    'reader_follows': int(os.getenv('BENCH_READER_FOLLOWS', 100)),
+}
+ROUNDS = int(os.getenv('BENCH_ROUNDS', 30))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+READER = 'bench_reader'
+HOT_POST_ID = 1
+
+
+def synthetic_records(usernames, slugs):
+    """Записи для posts.importer: посты, комментарии и подписки."""
+    fake = Faker('ru_RU')
+    fake.seed_instance(SEED)
+    rng = random.Random(SEED)
+    now = timezone.now()
+    for number in range(1, SIZES['posts'] + 1):
+        yield {
+            'model': 'post',
+            'id': number,
+            'author': rng.choice(usernames),
+            'group': rng.choice(slugs) if rng.random() < 0.5 else None,
+            'text': fake.text(max_nb_chars=300),
+            'pub_date': (now - timedelta(minutes=number)).isoformat(),
+        }
+    for number in range(SIZES['hot_post_comments']):
+        yield {'model': 'comment', 'post': HOT_POST_ID,
+               'author': rng.choice(usernames),
+               'text': fake.sentence()}
+    for number in range(SIZES['comments']):
+        yield {'model': 'comment', 'post': rng.randint(2, SIZES['posts']),
+               'author': rng.choice(usernames),
+               'text': fake.sentence()}
+    for author in rng.sample(usernames, SIZES['reader_follows']):
+        yield {'model': 'follow', 'user': READER, 'author': author}
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Один набор данных на весь прогон: создаётся до первого замера."""
+    from django.contrib.auth.models import User
+    from posts import importer
+    from posts.models import Group
+
+    with django_db_blocker.unblock():
+        users = mixer.cycle(SIZES['users']).blend(
+            User, username=mixer.sequence('bench_user_{0}'))
+        groups = mixer.cycle(SIZES['groups']).blend(
+            Group, slug=mixer.sequence('bench-group-{0}'))
+        User.objects.create_user(username=READER)
+        loader = importer.Importer()
+        records = synthetic_records([user.username for user in users],
+                                    [group.slug for group in groups])
+        for _ in loader.run(enumerate(records, start=1)):
+            pass
+        loader.finish()
+        assert not loader.failed, loader.errors[:5]
+
+
+@pytest.fixture(autouse=True)
+def inline_background_work(settings):
+    settings.BACKGROUND_WORKERS = 0
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1,
+                       round(share * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(timings, queries):
+    ms = [elapsed * 1000 for elapsed in timings]
+    return {
+        'rounds': len(ms),
+        'mean_ms': round(sum(ms) / len(ms), 3),
+        'p50_ms': round(percentile(ms, 0.5), 3),
+        'p90_ms': round(percentile(ms, 0.9), 3),
+        'p99_ms': round(percentile(ms, 0.99), 3),
+        'max_ms': round(max(ms), 3),
+        'queries_median': percentile(queries, 0.5),
+        'queries_max': max(queries),
+        'throughput_rps': round(len(ms) / sum(timings), 1),
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True, cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+@pytest.fixture(scope='session')
+def results():
+    collected = {}
+    yield collected
+    if not collected:
+        return
+    revision = commit()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.getenv('BENCH_OUTPUT',
+                     os.path.join(RESULTS_DIR, f'{revision}.json'))
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump({
+            'commit': revision,
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sizes': SIZES,
+            'scenarios': dict(sorted(collected.items())),
+        }, stream, ensure_ascii=False, indent=2)
+
+
+@pytest.fixture
+def bench(results):
+    """bench(name, make_request, cold=False): замер сценария.
+
+    cold=True очищает кеш перед каждым запросом.
+    """
+    def run(name, make_request, cold=False, rounds=ROUNDS):
+        make_request()
+        timings, queries = [], []
+        for _ in range(rounds):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = make_request()
+                timings.append(time.perf_counter() - started)
+            assert response.status_code in (200, 302), name
+            queries.append(len(captured))
+        results[name] = summarize(timings, queries)
+        return results[name]
+    return run
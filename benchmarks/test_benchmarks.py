@@ -0,0 +1,82 @@
+import pytest
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.utils import POST_ON_PAGE, CursorPaginator
+
+from .conftest import HOT_POST_ID, READER, SIZES
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def reader_client(client):
+    client.force_login(User.objects.get(username=READER))
+    return client
+
+
+@pytest.mark.parametrize('cold', (False, True), ids=('warm', 'cold'))
+def test_index(bench, client, cold):
+    url = reverse('posts:index')
+    bench(f'index_{"cold" if cold else "warm"}', lambda: client.get(url),
+          cold=cold)
+
+
+def test_index_deep_page(bench, client):
+    page = SIZES['posts'] // POST_ON_PAGE // 2
+    url = reverse('posts:index') + f'?page={page}'
+    bench('index_deep_page', lambda: client.get(url), cold=True)
+
+
+def test_index_deep_cursor(bench, client):
+    paginator = CursorPaginator(Post.objects.all(), POST_ON_PAGE)
+    middle = Post.objects.order_by('-pub_date', '-id')[SIZES['posts'] // 2]
+    url = (reverse('posts:index')
+           + f'?cursor={paginator.encode_cursor(middle, "n")}')
+    bench('index_deep_cursor', lambda: client.get(url), cold=True)
+
+
+def test_profile(bench, client):
+    author = Post.objects.get(id=HOT_POST_ID).author
+    url = reverse('posts:profile', kwargs={'username': author.username})
+    bench('profile', lambda: client.get(url), cold=True)
+
+
+def test_group_posts(bench, client):
+    url = reverse('posts:group_list',
+                  kwargs={'slug': Group.objects.first().slug})
+    bench('group_posts', lambda: client.get(url), cold=True)
+
+
+def test_follow_index(bench, reader_client):
+    url = reverse('posts:follow_index')
+    bench('follow_index', lambda: reader_client.get(url), cold=True)
+
+
+def test_post_detail_many_comments(bench, client):
+    url = reverse('posts:post_detail', kwargs={'post_id': HOT_POST_ID})
+    bench('post_detail_many_comments', lambda: client.get(url), cold=True)
+
+
+def test_post_create(bench, user_client):
+    url = reverse('posts:post_create')
+    bench('post_create',
+          lambda: user_client.post(url, {'text': 'Замер создания поста'}))
+
+
+def test_add_comment(bench, user_client):
+    url = reverse('posts:add_comment', kwargs={'post_id': HOT_POST_ID})
+    bench('add_comment',
+          lambda: user_client.post(url, {'text': 'Замер комментария'}))
+
+
+def test_follow_unfollow(bench, user_client):
+    author = Post.objects.get(id=HOT_POST_ID).author.username
+    urls = [reverse('posts:profile_follow', kwargs={'username': author}),
+            reverse('posts:profile_unfollow', kwargs={'username': author})]
+
+    def toggle():
+        urls.reverse()
+        return user_client.get(urls[0])
+
+    bench('follow_unfollow', toggle)
@@ -0,0 +1,53 @@
+POST_FIELDS = ('id', 'text', 'pub_date', 'author', 'group', 'image',
+               'comments_count')
+FIELDS_PARAM = 'fields'
+
+
+def selected_fields(request):
+    """Поля поста из ?fields=id,text; без параметра — все."""
+    requested = request.GET.get(FIELDS_PARAM, '').split(',')
+    fields = [name for name in POST_FIELDS if name in requested]
+    return fields or POST_FIELDS
+
+
+def _post_value(post, name):
+    if name == 'pub_date':
+        return post.pub_date.isoformat()
+    if name == 'author':
+        return post.author.username
+    if name == 'group':
+        return post.group.slug if post.group_id else None
+    if name == 'image':
+        return post.image.url if post.image else None
+    return getattr(post, name)
+
+
+def post_data(post, fields=POST_FIELDS):
+    return {name: _post_value(post, name) for name in fields}
+
+
+def group_data(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }
+
+
+def author_data(author, stats):
+    return {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
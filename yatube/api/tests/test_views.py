@@ -0,0 +1,190 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import POST_ON_PAGE
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author',
+                                              first_name='Лев',
+                                              last_name='Толстой')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Тестовый пост')
+        Comment.objects.create(post=cls.post, author=cls.user,
+                               text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feeds_serialize_posts(self):
+        """Ленты отдают компактные записи постов."""
+        expected = {
+            'id': self.post.id,
+            'text': 'Тестовый пост',
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'author',
+            'group': 'group',
+            'image': None,
+            'comments_count': 1,
+        }
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_list', kwargs={'slug': 'group'}),
+            reverse('api:profile', kwargs={'username': 'author'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response['Content-Type'],
+                                 'application/json')
+                self.assertEqual(response.json()['results'], [expected])
+        response = self.guest_client.get(
+            reverse('api:profile', kwargs={'username': 'author'}))
+        self.assertEqual(response.json()['author']['full_name'],
+                         'Лев Толстой')
+        self.assertIn('Тестовый пост'.encode(), response.content)
+
+    def test_field_selection(self):
+        response = self.guest_client.get(reverse('api:index'),
+                                         {'fields': 'id,text,unknown'})
+        self.assertEqual(response.json()['results'],
+                         [{'id': self.post.id, 'text': 'Тестовый пост'}])
+
+    def test_cursor_pagination(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}')
+            for i in range(POST_ON_PAGE))
+        data = self.guest_client.get(reverse('api:index'),
+                                     {'fields': 'id'}).json()
+        self.assertEqual(len(data['results']), POST_ON_PAGE)
+        self.assertIsNone(data['previous'])
+        self.assertIn('fields=id', data['next'])
+        data = self.guest_client.get(data['next']).json()
+        self.assertEqual(data['results'], [{'id': self.post.id}])
+        self.assertIsNone(data['next'])
+
+    def test_post_detail_includes_comments(self):
+        data = self.guest_client.get(reverse(
+            'api:post_detail', kwargs={'post_id': self.post.id})).json()
+        self.assertEqual(data['post']['id'], self.post.id)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']['results']],
+            ['Комментарий'])
+
+    def test_missing_objects_return_json_404(self):
+        urls = (
+            reverse('api:post_detail', kwargs={'post_id': 0}),
+            reverse('api:group_list', kwargs={'slug': 'missing'}),
+            reverse('api:profile', kwargs={'username': 'missing'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def test_follow_feed_requires_login(self):
+        url = reverse('api:follow_index')
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.authorized_client.get(url, {'fields': 'id'})
+        self.assertEqual(response.json()['results'], [{'id': self.post.id}])
+
+    def test_read_only(self):
+        response = self.authorized_client.post(reverse('api:index'))
+        self.assertEqual(response.status_code, 405)
+
+
+class ApiConditionalTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author,
+                                       text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        Follow.objects.create(user=self.user, author=self.author)
+
+    def revalidate(self, url):
+        """Код ответа на повторный запрос с валидаторами первого."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return lambda **headers: self.client.get(url, **{
+            'HTTP_IF_NONE_MATCH': response['ETag'], **headers}).status_code
+
+    def test_unchanged_resources_return_304(self):
+        urls = (
+            reverse('api:index'),
+            reverse('api:profile', kwargs={'username': 'author'}),
+            reverse('api:follow_index'),
+            reverse('api:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(self.revalidate(url)(), 304)
+                if url in (reverse('api:follow_index'),
+                           reverse('api:profile',
+                                   kwargs={'username': 'author'})):
+                    # Подписки и счётчики профиля проверяют только по ETag.
+                    self.assertNotIn('Last-Modified', response)
+                    continue
+                self.assertEqual(self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+                ).status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        """Новые посты, правки и комментарии меняют ETag."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:profile', kwargs={'username': 'author'}),
+            reverse('api:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                check = self.revalidate(url)
+                post = Post.objects.create(author=self.author, text='Ещё')
+                self.assertEqual(check(), 200)
+                check = self.revalidate(url)
+                post.text = 'Правка'
+                post.save()
+                self.assertEqual(check(), 200)
+        check = self.revalidate(reverse(
+            'api:post_detail', kwargs={'post_id': self.post.id}))
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        self.assertEqual(check(), 200)
+
+    def test_follow_invalidates_profile(self):
+        """Подписка меняет счётчики профиля, а с ними и ETag."""
+        guest = Client()
+        url = reverse('api:profile', kwargs={'username': 'author'})
+        response = guest.get(url)
+        self.assertEqual(response.json()['author']['followers_count'], 1)
+        Follow.objects.create(
+            user=User.objects.create_user(username='other'),
+            author=self.author)
+        response = guest.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author']['followers_count'], 2)
+
+    def test_unfollow_invalidates_follow_feed(self):
+        check = self.revalidate(reverse('api:follow_index'))
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(check(), 200)
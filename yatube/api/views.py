@@ -0,0 +1,141 @@
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from posts import conditional, counters, feed_cache, timeline
+from posts.models import Group, Post, User
+from posts.utils import (CURSOR_PARAM, POST_ON_PAGE, CursorPaginator,
+                         comment_page)
+
+from . import serializers
+
+# Компактный JSON: без пробелов и \u-экранирования кириллицы.
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def api_view(view):
+    """Только GET/HEAD, ошибки — в JSON."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return json_response({'detail': 'Не найдено.'}, status=404)
+    return wrapper
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query[CURSOR_PARAM] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def feed_data(request, posts):
+    """Страница ленты с курсорами соседних страниц."""
+    return page_data(request, CursorPaginator(posts, POST_ON_PAGE).get_page(
+        request.GET.get(CURSOR_PARAM)))
+
+
+def page_data(request, page):
+    fields = serializers.selected_fields(request)
+    return {
+        'results': [serializers.post_data(post, fields) for post in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    }
+
+
+def index_state(request):
+    return conditional.feed_state(Post.objects.all(), feed_cache.INDEX_FEED)
+
+
+def group_state(request, slug):
+    group_id = (Group.objects.filter(slug=slug)
+                .values_list('id', flat=True).first())
+    if group_id is not None:
+        return conditional.feed_state(Post.objects.filter(group=group_id),
+                                      feed_cache.group_feed(group_id))
+
+
+def profile_state(request, username):
+    # Счётчики автора есть в ответе, но версий лент не сдвигают:
+    # они входят в ETag, как на HTML-странице профиля.
+    row = (User.objects.filter(username=username)
+           .values_list('id', 'stats__posts_count', 'stats__followers_count',
+                        'stats__following_count')
+           .first())
+    if row is not None:
+        author_id, *stats = row
+        return conditional.for_user(request, conditional.feed_state(
+            Post.objects.filter(author=author_id),
+            feed_cache.profile_feed(author_id)), *stats)
+
+
+def post_state(request, post_id):
+    return conditional.post_state(post_id)
+
+
+def follow_state(request):
+    if request.user.is_authenticated:
+        return conditional.follow_state(request.user)
+
+
+@api_view
+@conditional.conditional(index_state)
+def index(request):
+    return json_response(feed_data(request, Post.objects.feed()))
+
+
+@api_view
+@conditional.conditional(group_state)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    data = {'group': serializers.group_data(group)}
+    data.update(feed_data(request, group.groups.feed()))
+    return json_response(data)
+
+
+@api_view
+@conditional.conditional(profile_state)
+def profile(request, username):
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    data = {'author': serializers.author_data(
+        author, counters.stats_for(author))}
+    data.update(feed_data(request, author.posts.feed()))
+    return json_response(data)
+
+
+@api_view
+@conditional.conditional(follow_state)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_response({'detail': 'Требуется авторизация.'},
+                             status=401)
+    return json_response(page_data(request, timeline.follow_page(
+        request.user, request.GET.get(CURSOR_PARAM))))
+
+
+@api_view
+@conditional.conditional(post_state)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.feed(), id=post_id)
+    comments = comment_page(post, request.GET.get(CURSOR_PARAM))
+    return json_response({
+        'post': serializers.post_data(
+            post, serializers.selected_fields(request)),
+        'comments': {
+            'results': [serializers.comment_data(comment)
+                        for comment in comments],
+            'next': page_url(request, comments.next_cursor),
+        },
+    })
@@ -0,0 +1,31 @@
+from django.contrib import admin
+
+from .models import OutboundEmail, Task
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk',
+                    'subject',
+                    'to',
+                    'status',
+                    'attempts',
+                    'next_attempt_at',
+                    'sent_at',)
+    list_filter = ('status',)
+    search_fields = ('to', 'subject')
+    empty_value_display = '-пусто-'
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk',
+                    'name',
+                    'key',
+                    'priority',
+                    'status',
+                    'attempts',
+                    'run_at',)
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    empty_value_display = '-пусто-'
@@ -0,0 +1,93 @@
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import perf
+
+HITS = 'hits'
+MISSES = 'misses'
+STATS_KEY = 'core:cache_stats:{}:{}'
+STATS_NAMES_KEY = 'core:cache_stats:names'
+
+_lock = threading.Lock()
+_pending = Counter()
+_local = Counter()
+
+
+def record(name, hit):
+    """Учитывает попадание или промах кеша с именем name."""
+    perf.note_cache(hit)
+    event = (name, HITS if hit else MISSES)
+    with _lock:
+        _local[event] += 1
+        _pending[event] += 1
+        if sum(_pending.values()) < settings.CACHE_STATS_FLUSH_EVERY:
+            return
+        pending = dict(_pending)
+        _pending.clear()
+    _flush(pending)
+
+
+def _flush(pending):
+    """Переносит накопленные процессом счётчики в общий кеш.
+
+    add и incr файлового кеша не атомарны: при одновременном сбросе
+    из нескольких процессов часть событий может потеряться, так что
+    общие счётчики на этом кеше приблизительные.
+    """
+    names = set(cache.get(STATS_NAMES_KEY, ()))
+    for (name, kind), value in pending.items():
+        names.add(name)
+        key = STATS_KEY.format(name, kind)
+        if not cache.add(key, value, None):
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, None)
+    cache.set(STATS_NAMES_KEY, sorted(names), None)
+
+
+def flush():
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if pending:
+        _flush(pending)
+
+
+def local_stats():
+    """Счётчики текущего процесса: {имя: {'hits': ..., 'misses': ...}}."""
+    with _lock:
+        events = dict(_local)
+    return _group(events)
+
+
+def shared_stats():
+    """Счётчики всех процессов, уже сброшенные в общий кеш."""
+    flush()
+    names = cache.get(STATS_NAMES_KEY, ())
+    keys = {
+        STATS_KEY.format(name, kind): (name, kind)
+        for name in names for kind in (HITS, MISSES)
+    }
+    values = cache.get_many(list(keys))
+    return _group({keys[key]: value for key, value in values.items()})
+
+
+def _group(events):
+    stats = {}
+    for (name, kind), value in sorted(events.items()):
+        stats.setdefault(name, {HITS: 0, MISSES: 0})[kind] = value
+    return stats
+
+
+def reset():
+    with _lock:
+        _pending.clear()
+        _local.clear()
+    cache.delete_many([
+        STATS_KEY.format(name, kind)
+        for name in cache.get(STATS_NAMES_KEY, ()) for kind in (HITS, MISSES)
+    ] + [STATS_NAMES_KEY])
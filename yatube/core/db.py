@@ -0,0 +1,54 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+LOCKED_MESSAGE = 'database is locked'
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение с SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    return LOCKED_MESSAGE in str(error)
+
+
+def call_retrying(func, *args, **kwargs):
+    """Выполняет func в транзакции, повторяя её, пока база занята.
+
+    Неудачная попытка откатывается целиком; паузы между попытками
+    растут вдвое.
+    """
+    delay = settings.DB_LOCKED_RETRY_DELAY
+    for attempt in range(settings.DB_LOCKED_RETRIES + 1):
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError as error:
+            if (not is_locked(error)
+                    or attempt == settings.DB_LOCKED_RETRIES):
+                raise
+        time.sleep(delay)
+        delay *= 2
+
+
+def retry_locked(view):
+    """Повторяет пишущее представление, если база занята другим писателем.
+
+    Всё представление повторяется через call_retrying, поэтому
+    сохранять в нём файлы нельзя: каждая попытка записала бы новый.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return call_retrying(view, request, *args, **kwargs)
+    return wrapper
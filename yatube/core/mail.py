@@ -0,0 +1,151 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import models
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+HTML_TYPE = 'text/html'
+LEASE_EXPIRED = ('Обработчик не завершил последнюю попытку за '
+                 'MAIL_QUEUE_LEASE')
+
+
+def _lines(addresses):
+    return '\n'.join(addresses)
+
+
+def _addresses(text):
+    return text.split('\n') if text else []
+
+
+def enqueue(message):
+    """Строка очереди для EmailMessage; вложения очередь не хранит."""
+    if message.attachments:
+        raise ValueError('Очередь писем не поддерживает вложения')
+    html = next((content for content, mimetype
+                 in getattr(message, 'alternatives', ())
+                 if mimetype == HTML_TYPE), '')
+    return OutboundEmail(
+        subject=message.subject,
+        body=message.body,
+        html=html,
+        from_email=message.from_email,
+        to=_lines(message.to),
+        cc=_lines(message.cc),
+        bcc=_lines(message.bcc),
+        reply_to=_lines(message.reply_to),
+        headers=json.dumps(message.extra_headers, ensure_ascii=False),
+    )
+
+
+def build_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=_addresses(email.to),
+        cc=_addresses(email.cc),
+        bcc=_addresses(email.bcc),
+        reply_to=_addresses(email.reply_to),
+        headers=json.loads(email.headers),
+        connection=connection,
+    )
+    if email.html:
+        message.attach_alternative(email.html, HTML_TYPE)
+    return message
+
+
+class QueueBackend(BaseEmailBackend):
+    """EMAIL_BACKEND, который только ставит письма в очередь.
+
+    Отправляет их команда send_queued_mail через MAIL_QUEUE_BACKEND,
+    поэтому представления не ждут почтовый сервер. Письма записываются
+    в транзакции запроса и пропадают вместе с её откатом.
+    """
+
+    def send_messages(self, email_messages):
+        emails = [enqueue(message) for message in email_messages
+                  if message.recipients()]
+        OutboundEmail.objects.bulk_create(emails)
+        return len(emails)
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой; растёт вдвое с каждой неудачей."""
+    return timedelta(
+        seconds=settings.MAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def claim(batch_size):
+    """Забирает пачку писем, которым пора уйти.
+
+    На время отправки их следующая попытка отодвигается на
+    MAIL_QUEUE_LEASE секунд, так что другой обработчик их не возьмёт,
+    а письма упавшего обработчика вернутся в очередь сами. Попытка
+    засчитывается сразу: письмо, на котором обработчик падает,
+    не будет забираться бесконечно.
+    """
+    now = timezone.now()
+    OutboundEmail.objects.filter(
+        status=OutboundEmail.PENDING, next_attempt_at__lte=now,
+        attempts__gte=settings.MAIL_QUEUE_MAX_ATTEMPTS,
+    ).update(status=OutboundEmail.FAILED, last_error=LEASE_EXPIRED)
+    due = OutboundEmail.objects.filter(status=OutboundEmail.PENDING,
+                                       next_attempt_at__lte=now)
+    ids = list(due.order_by('next_attempt_at', 'pk')
+               .values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    lease = now + timedelta(seconds=settings.MAIL_QUEUE_LEASE)
+    due.filter(pk__in=ids).update(next_attempt_at=lease,
+                                  attempts=models.F('attempts') + 1)
+    return list(OutboundEmail.objects.filter(pk__in=ids,
+                                             next_attempt_at=lease)
+                .order_by('pk'))
+
+
+def send_batch(batch_size=None):
+    """Отправляет пачку писем одним соединением; возвращает
+    (отправлено, неудачных попыток)."""
+    emails = claim(batch_size or settings.MAIL_QUEUE_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+    sent, failed = 0, 0
+    connection = get_connection(settings.MAIL_QUEUE_BACKEND)
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            record_failure(email, error)
+        return 0, len(emails)
+    try:
+        for email in emails:
+            try:
+                build_message(email, connection).send()
+            except Exception as error:
+                failed += 1
+                record_failure(email, error)
+            else:
+                # Отмечается сразу: при падении обработчика посреди
+                # пачки отправленное письмо не уйдёт повторно.
+                sent += 1
+                OutboundEmail.objects.filter(pk=email.pk).update(
+                    status=OutboundEmail.SENT, sent_at=timezone.now(),
+                    last_error='')
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def record_failure(email, error):
+    """Планирует повтор; попытка уже засчитана в claim()."""
+    email.last_error = f'{type(error).__name__}: {error}'
+    if email.attempts >= settings.MAIL_QUEUE_MAX_ATTEMPTS:
+        email.status = OutboundEmail.FAILED
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['last_error', 'status', 'next_attempt_at'])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core import cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Выводит попадания и промахи кеша по всем процессам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Обнулить счётчики после вывода')
+
+    def handle(self, *args, **options):
+        for name, stats in cache_stats.shared_stats().items():
+            total = stats[cache_stats.HITS] + stats[cache_stats.MISSES]
+            ratio = stats[cache_stats.HITS] / total if total else 0
+            self.stdout.write(
+                f'{name}: попаданий {stats[cache_stats.HITS]}, '
+                f'промахов {stats[cache_stats.MISSES]}, '
+                f'доля попаданий {ratio:.1%}')
+        if options['reset']:
+            cache_stats.reset()
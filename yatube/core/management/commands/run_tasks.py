@@ -0,0 +1,70 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import tasks
+
+
+def init_worker():
+    # Соединение родителя, унаследованное при fork, не закрываем и не
+    # используем: процесс откроет своё.
+    for connection in connections.all():
+        connection.connection = None
+
+
+class Command(BaseCommand):
+    help = 'Выполняет отложенные задачи из очереди core.tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=settings.TASKS_PROCESSES,
+                            help='число процессов; 0 — в этом процессе')
+        parser.add_argument('--batch-size', type=int,
+                            help='задач, забираемых за раз')
+        parser.add_argument('--loop', action='store_true',
+                            help='работать постоянно, ожидая новые задачи')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='пауза в секундах, когда очередь пуста')
+
+    @staticmethod
+    def make_pool(processes):
+        if not processes:
+            return None
+        # fork: дочерние процессы получают уже настроенный Django.
+        return ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=init_worker)
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        limit = options['batch_size'] or max(processes, 1) * 2
+        pool = self.make_pool(processes)
+        total_done = total_failed = 0
+        try:
+            while True:
+                try:
+                    done, failed = tasks.run_batch(pool, limit)
+                except BrokenProcessPool as error:
+                    self.stderr.write(f'{error}; пул создаётся заново')
+                    pool.shutdown(wait=False)
+                    pool = self.make_pool(processes)
+                    continue
+                total_done += done
+                total_failed += failed
+                if done or failed:
+                    self.stdout.write(f'выполнено {done}, ошибок {failed}')
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: выполнено {total_done}, ошибок {total_failed}'))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import mail
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди core.mail'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help='писем на одно соединение с сервером')
+        parser.add_argument('--loop', action='store_true',
+                            help='работать постоянно, ожидая новые письма')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='пауза в секундах, когда очередь пуста')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = mail.send_batch(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'отправлено {sent}, ошибок {failed}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: отправлено {total_sent}, ошибок {total_failed}'))
@@ -0,0 +1,71 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import perf, routers
+
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryPinMiddleware:
+    """Закрепляет пользователя за основной базой после записи.
+
+    Пока реплики догоняют основную базу, запросы с кукой PIN_COOKIE
+    читают из основной — автор сразу видит свой пост.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        if (request.method not in SAFE_METHODS
+                or PIN_COOKIE in request.COOKIES):
+            routers.pin_primary()
+        try:
+            response = self.get_response(request)
+            if routers.wrote() and settings.DATABASE_REPLICAS:
+                response.set_cookie(
+                    PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax')
+            return response
+        finally:
+            routers.reset()
+
+
+class PerfMiddleware:
+    """Замеряет время, запросы к базе, кеш, шаблоны и размер ответа.
+
+    Замеры копятся по имени представления (resolver_match.view_name);
+    запросы дольше PERF_SLOW_REQUEST_MS пишутся в журнал вместе с SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        perf.instrument_templates()
+
+    def __call__(self, request):
+        perf.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(perf.query_wrapper))
+                response = self.get_response(request)
+        finally:
+            stats, sql = perf.stop()
+        stats['wall_us'] = int((time.perf_counter() - started) * perf.MS
+                               * perf.MS)
+        if not response.streaming:
+            stats['bytes'] = len(response.content)
+        match = request.resolver_match
+        view = match.view_name if match else perf.UNRESOLVED
+        perf.record(view, stats)
+        slow = settings.PERF_SLOW_REQUEST_MS
+        if slow and stats['wall_us'] >= slow * perf.MS:
+            perf.log_slow(request, view, stats, sql)
+        return response
@@ -0,0 +1,103 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboundEmail(models.Model):
+    """Письмо в очереди на отправку (core.mail)."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.TextField(verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    html = models.TextField(blank=True, verbose_name='HTML')
+    from_email = models.CharField(max_length=254,
+                                  verbose_name='Отправитель')
+    # Адреса — по одному на строку.
+    to = models.TextField(verbose_name='Кому')
+    cc = models.TextField(blank=True, verbose_name='Копия')
+    bcc = models.TextField(blank=True, verbose_name='Скрытая копия')
+    reply_to = models.TextField(blank=True, verbose_name='Ответить')
+    headers = models.TextField(default='{}', verbose_name='Заголовки')
+    status = models.CharField(max_length=10,
+                              choices=STATUSES,
+                              default=PENDING,
+                              verbose_name='Состояние')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попыток')
+    next_attempt_at = models.DateTimeField(default=timezone.now,
+                                           verbose_name='Следующая попытка')
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Создано')
+    sent_at = models.DateTimeField(null=True, blank=True,
+                                   verbose_name='Отправлено')
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.subject[:30]
+
+
+class Task(models.Model):
+    """Отложенный вызов функции (core.tasks)."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнено'),
+    )
+
+    # Путь к функции уровня модуля и её аргументы в JSON.
+    name = models.CharField(max_length=255, verbose_name='Функция')
+    args = models.TextField(default='[]', verbose_name='Аргументы')
+    key = models.CharField(max_length=255,
+                           null=True,
+                           blank=True,
+                           verbose_name='Ключ')
+    priority = models.SmallIntegerField(default=0,
+                                        verbose_name='Приоритет')
+    status = models.CharField(max_length=10,
+                              choices=STATUSES,
+                              default=PENDING,
+                              verbose_name='Состояние')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Предел попыток')
+    # Для ждущей задачи — когда её можно начать, для выполняемой —
+    # когда её можно забрать у упавшего обработчика.
+    run_at = models.DateTimeField(default=timezone.now,
+                                  verbose_name='Запуск')
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Создано')
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        constraints = [
+            models.UniqueConstraint(fields=['key'],
+                                    condition=models.Q(status='pending'),
+                                    name='unique_pending_task_key'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_at', 'priority'],
+                         name='task_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
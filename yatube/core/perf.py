@@ -0,0 +1,215 @@
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('yatube.perf')
+
+PERF_KEY = 'core:perf:{}:{}'
+PERF_VIEWS_KEY = 'core:perf:views'
+UNRESOLVED = '<unresolved>'
+COUNT = 'count'
+CACHE_HITS = 'cache_hits'
+CACHE_MISSES = 'cache_misses'
+INF = 'inf'
+MS = 1000
+# Верхние границы корзин гистограмм; время — в микросекундах.
+TIME_BOUNDS = tuple(ms * MS for ms in (5, 10, 25, 50, 100, 250, 500, 1000,
+                                       2500))
+METRICS = {
+    'wall_us': TIME_BOUNDS,
+    'db_us': TIME_BOUNDS,
+    'template_us': TIME_BOUNDS,
+    'queries': (0, 1, 2, 5, 10, 20, 50, 100),
+    'bytes': (1024, 10 * 1024, 50 * 1024, 100 * 1024, 500 * 1024,
+              1024 * 1024),
+}
+
+_lock = threading.Lock()
+_pending = Counter()
+_pending_requests = [0]
+_request = threading.local()
+
+
+def _fields():
+    fields = [COUNT, CACHE_HITS, CACHE_MISSES]
+    for metric, bounds in METRICS.items():
+        fields.append(f'{metric}:sum')
+        fields.extend(f'{metric}:{bucket}'
+                      for bucket in (*bounds, INF))
+    return fields
+
+
+FIELDS = _fields()
+
+
+def _bucket(metric, value):
+    bounds = METRICS[metric]
+    index = bisect.bisect_left(bounds, value)
+    return bounds[index] if index < len(bounds) else INF
+
+
+def start():
+    """Начинает учёт для запроса, обрабатываемого текущим потоком."""
+    _request.stats = Counter()
+    _request.sql = []
+    _request.depth = 0
+
+
+def stop():
+    stats, sql = current(), getattr(_request, 'sql', [])
+    _request.stats = None
+    _request.sql = []
+    return stats, sql
+
+
+def current():
+    return getattr(_request, 'stats', None)
+
+
+def note_cache(hit):
+    stats = current()
+    if stats is not None:
+        stats[CACHE_HITS if hit else CACHE_MISSES] += 1
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """execute_wrapper: время и текст запросов текущего запроса."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats = current()
+        if stats is not None:
+            elapsed = int((time.perf_counter() - started) * MS * MS)
+            stats['queries'] += 1
+            stats['db_us'] += elapsed
+            if len(_request.sql) < settings.PERF_SQL_LIMIT:
+                _request.sql.append((elapsed, sql))
+
+
+def instrument_templates():
+    """Учитывает время отрисовки шаблонов верхнего уровня."""
+    from django.template.backends.django import Template
+
+    original = Template.render
+    if getattr(original, 'instrumented', False):
+        return
+
+    @wraps(original)
+    def render(self, *args, **kwargs):
+        stats = current()
+        if stats is None or _request.depth:
+            return original(self, *args, **kwargs)
+        _request.depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            _request.depth -= 1
+            stats['template_us'] += int(
+                (time.perf_counter() - started) * MS * MS)
+
+    render.instrumented = True
+    Template.render = render
+
+
+def record(view, stats):
+    """Добавляет замеры запроса к счётчикам представления."""
+    events = Counter({(view, COUNT): 1,
+                      (view, CACHE_HITS): stats[CACHE_HITS],
+                      (view, CACHE_MISSES): stats[CACHE_MISSES]})
+    for metric in METRICS:
+        value = stats[metric]
+        events[(view, f'{metric}:sum')] += value
+        events[(view, f'{metric}:{_bucket(metric, value)}')] += 1
+    with _lock:
+        _pending.update(events)
+        _pending_requests[0] += 1
+        if _pending_requests[0] < settings.PERF_FLUSH_EVERY:
+            return
+        pending = dict(_pending)
+        _pending.clear()
+        _pending_requests[0] = 0
+    _flush(pending)
+
+
+def _flush(pending):
+    # Как и в cache_stats, на файловом кеше сумма приблизительная.
+    views = set(cache.get(PERF_VIEWS_KEY, ()))
+    for (view, field), value in pending.items():
+        if not value:
+            continue
+        views.add(view)
+        key = PERF_KEY.format(view, field)
+        if not cache.add(key, value, None):
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, None)
+    cache.set(PERF_VIEWS_KEY, sorted(views), None)
+
+
+def flush():
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _pending_requests[0] = 0
+    if pending:
+        _flush(pending)
+
+
+def shared_stats():
+    """Сводка всех процессов: {представление: {метрика: гистограмма}}."""
+    flush()
+    views = cache.get(PERF_VIEWS_KEY, ())
+    keys = {PERF_KEY.format(view, field): (view, field)
+            for view in views for field in FIELDS}
+    values = cache.get_many(list(keys))
+    report = {}
+    for view in views:
+        raw = {field: values.get(PERF_KEY.format(view, field), 0)
+               for field in FIELDS}
+        count = raw[COUNT]
+        report[view] = {
+            COUNT: count,
+            CACHE_HITS: raw[CACHE_HITS],
+            CACHE_MISSES: raw[CACHE_MISSES],
+        }
+        for metric, bounds in METRICS.items():
+            report[view][metric] = {
+                'mean': round(raw[f'{metric}:sum'] / count, 1)
+                if count else 0,
+                'histogram': {
+                    str(bucket): raw[f'{metric}:{bucket}']
+                    for bucket in (*bounds, INF)
+                },
+            }
+    return report
+
+
+def reset():
+    with _lock:
+        _pending.clear()
+        _pending_requests[0] = 0
+    cache.delete_many([
+        PERF_KEY.format(view, field)
+        for view in cache.get(PERF_VIEWS_KEY, ()) for field in FIELDS
+    ] + [PERF_VIEWS_KEY])
+
+
+def log_slow(request, view, stats, sql):
+    """Пишет в журнал медленный запрос вместе с его SQL."""
+    lines = [f'{elapsed / MS:.1f} ms: {statement}'
+             for elapsed, statement in sql]
+    logger.warning(
+        'Медленный запрос %s %s (%s): %.1f ms, запросов к базе %s '
+        '(%.1f ms), шаблоны %.1f ms, %s байт\n%s',
+        request.method, request.get_full_path(), view,
+        stats['wall_us'] / MS, stats['queries'], stats['db_us'] / MS,
+        stats['template_us'] / MS, stats['bytes'], '\n'.join(lines))
@@ -0,0 +1,60 @@
+import random
+import threading
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+def reset():
+    _state.pinned = False
+    _state.wrote = False
+    _state.replica = None
+
+
+def pin_primary():
+    """Дальнейшие чтения в этом потоке идут в основную базу."""
+    _state.pinned = True
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def on_replica():
+    """Читает ли сейчас поток с реплики."""
+    return bool(settings.DATABASE_REPLICAS) and not is_pinned()
+
+
+def wrote():
+    """Была ли запись в основную базу с последнего reset()."""
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    """Чтение — с реплик, запись и чтение после записи — с основной базы."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned():
+            return PRIMARY
+        # Одна реплика на запрос: реплики отстают по-разному, и соседние
+        # запросы не должны видеть данные разной свежести.
+        replica = getattr(_state, 'replica', None)
+        if replica not in replicas:
+            replica = _state.replica = random.choice(replicas)
+        return replica
+
+    def db_for_write(self, model, **hints):
+        # Своя запись должна быть видна сразу, реплика может отставать.
+        _state.wrote = True
+        pin_primary()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
@@ -0,0 +1,158 @@
+import json
+import traceback
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, models
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import routers
+from .models import Task
+
+HIGH = 10
+NORMAL = 0
+LOW = -10
+LEASE_EXPIRED = 'Обработчик не завершил последнюю попытку за TASKS_LEASE'
+
+
+def task_name(func):
+    name = f'{func.__module__}.{func.__qualname__}'
+    if '<' in name:
+        raise ValueError(f'{name}: нужна функция уровня модуля')
+    return name
+
+
+def defer(func, *args, key=None, priority=NORMAL, delay=0,
+          max_attempts=None):
+    """Ставит func(*args) в очередь; выполняет её команда run_tasks.
+
+    Аргументы должны сохраняться в JSON. Задача с ключом key, которая
+    ещё ждёт в очереди, не дублируется. Запись идёт в текущей
+    транзакции: при её откате задача не появится.
+    """
+    Task.objects.bulk_create([Task(
+        name=task_name(func),
+        args=json.dumps(args, ensure_ascii=False),
+        key=key,
+        priority=priority,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+    )], ignore_conflicts=True)
+
+
+def retry_delay(attempts):
+    """Пауза перед повтором; растёт вдвое с каждой неудачей."""
+    return timedelta(
+        seconds=settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def claim(limit):
+    """Забирает до limit задач: сначала с большим приоритетом.
+
+    Задача, которую обработчик не завершил за TASKS_LEASE секунд
+    (например, упал процесс), забирается снова, а после последней
+    попытки считается невыполненной.
+    """
+    now = timezone.now()
+    Task.objects.filter(
+        status=Task.RUNNING, run_at__lte=now,
+        attempts__gte=models.F('max_attempts'),
+    ).update(status=Task.FAILED, last_error=LEASE_EXPIRED)
+    due = Task.objects.filter(
+        models.Q(status=Task.PENDING)
+        | models.Q(status=Task.RUNNING,
+                   attempts__lt=models.F('max_attempts')),
+        run_at__lte=now,
+    )
+    ids = list(due.order_by('-priority', 'run_at', 'pk')
+               .values_list('pk', flat=True)[:limit])
+    if not ids:
+        return []
+    lease = now + timedelta(seconds=settings.TASKS_LEASE)
+    due.filter(pk__in=ids).update(status=Task.RUNNING, run_at=lease,
+                                  attempts=models.F('attempts') + 1)
+    return list(Task.objects.filter(pk__in=ids, status=Task.RUNNING,
+                                    run_at=lease)
+                .order_by('-priority', 'pk'))
+
+
+def execute(name, args):
+    """Выполняет задачу; возвращает текст ошибки или None.
+
+    Вызывается в процессе пула, поэтому получает только строки.
+    """
+    close_old_connections()
+    # Как и фоновые потоки, задача читает основную базу, а состояние
+    # роутера не переходит к следующей задаче процесса.
+    routers.reset()
+    routers.pin_primary()
+    try:
+        import_string(name)(*json.loads(args))
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        close_old_connections()
+        routers.reset()
+    return None
+
+
+def finish(task, error):
+    """Удаляет выполненную задачу или планирует повтор неудачной."""
+    if error is None:
+        Task.objects.filter(pk=task.pk, status=Task.RUNNING).delete()
+        return
+    task.last_error = error
+    if task.attempts >= task.max_attempts:
+        task.status = Task.FAILED
+    elif task.key and Task.objects.filter(key=task.key,
+                                          status=Task.PENDING).exists():
+        # Ту же работу выполнит копия, поставленная позже.
+        Task.objects.filter(pk=task.pk).delete()
+        return
+    else:
+        task.status = Task.PENDING
+        task.run_at = timezone.now() + retry_delay(task.attempts)
+    Task.objects.filter(pk=task.pk).update(
+        status=task.status, run_at=task.run_at, last_error=error)
+
+
+def _result(future):
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        return traceback.format_exc()
+
+
+def run_batch(pool=None, limit=None):
+    """Выполняет пачку задач в пуле процессов (без пула — на месте);
+    возвращает (выполнено, с ошибкой).
+
+    Если процесс пула погиб, результаты остальных задач всё равно
+    записываются, а затем BrokenProcessPool передаётся вызывающему,
+    чтобы тот создал новый пул.
+    """
+    tasks = claim(limit or settings.TASKS_BATCH_SIZE)
+    broken = False
+    if pool is None:
+        results = [execute(task.name, task.args) for task in tasks]
+    else:
+        futures = []
+        for task in tasks:
+            try:
+                futures.append(pool.submit(execute, task.name, task.args))
+            except BrokenProcessPool:
+                futures.append(None)
+        results = [_result(future) if future is not None
+                   else 'BrokenProcessPool: пул процессов недоступен'
+                   for future in futures]
+        broken = any(future is None
+                     or isinstance(future.exception(), BrokenProcessPool)
+                     for future in futures)
+    for task, error in zip(tasks, results):
+        finish(task, error)
+    if broken:
+        raise BrokenProcessPool('процесс пула задач завершился аварийно')
+    failed = sum(error is not None for error in results)
+    return len(tasks) - failed, failed
@@ -6,3 +6,11 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.simple_tag(takes_context=True)
+def replace_param(context, name, value):
+    """Строка запроса текущей страницы, где параметр name равен value."""
+    query = context['request'].GET.copy()
+    query[name] = value
+    return query.urlencode()
@@ -0,0 +1,54 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import cache_stats
+
+
+class CacheStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+
+    @override_settings(CACHE_STATS_FLUSH_EVERY=2)
+    def test_stats_are_flushed_to_shared_cache(self):
+        """Счётчики процесса сбрасываются в общий кеш пачками."""
+        cache_stats.record('feed', hit=False)
+        self.assertEqual(cache.get_many([
+            cache_stats.STATS_KEY.format('feed', cache_stats.MISSES)]), {})
+        cache_stats.record('feed', hit=True)
+        self.assertEqual(
+            cache_stats.shared_stats(),
+            {'feed': {cache_stats.HITS: 1, cache_stats.MISSES: 1}})
+
+    def test_feed_views_record_hits_and_misses(self):
+        """Ленты учитывают попадания и промахи кеша страниц."""
+        client = Client()
+        client.get(reverse('posts:index'))
+        client.get(reverse('posts:index'))
+        self.assertEqual(
+            cache_stats.local_stats()['feed'],
+            {cache_stats.HITS: 1, cache_stats.MISSES: 1})
+
+
+class SharedFileCacheTests(TestCase):
+    """Файловый кеш виден всем процессам, работающим с каталогом."""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+
+    def test_version_bump_is_visible_to_other_process(self):
+        params = {'KEY_PREFIX': 'yatube', 'VERSION': 1}
+        worker_1 = FileBasedCache(self.location, params)
+        worker_2 = FileBasedCache(self.location, params)
+        worker_1.set('posts:feed:version:index', 1, None)
+        worker_2.incr('posts:feed:version:index')
+        self.assertEqual(worker_1.get('posts:feed:version:index'), 2)
+        other_version = FileBasedCache(
+            self.location, {'KEY_PREFIX': 'yatube', 'VERSION': 2})
+        self.assertIsNone(other_version.get('posts:feed:version:index'))
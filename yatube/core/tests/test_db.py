@@ -0,0 +1,45 @@
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.db import retry_locked
+
+
+class SqlitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connection(self):
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+
+@override_settings(DB_LOCKED_RETRIES=2, DB_LOCKED_RETRY_DELAY=0)
+class RetryLockedTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().post('/')
+
+    def test_retries_locked_database(self):
+        """Блокировка базы повторяется, удачная попытка возвращается."""
+        view = mock.Mock(side_effect=[
+            OperationalError('database is locked'), HttpResponse('ok')])
+        response = retry_locked(view)(self.request)
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(view.call_count, 2)
+
+    def test_gives_up_after_limit(self):
+        view = mock.Mock(side_effect=OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            retry_locked(view)(self.request)
+        self.assertEqual(view.call_count, 3)
+
+    def test_other_errors_are_not_retried(self):
+        view = mock.Mock(side_effect=OperationalError('no such table'))
+        with self.assertRaises(OperationalError):
+            retry_locked(view)(self.request)
+        self.assertEqual(view.call_count, 1)
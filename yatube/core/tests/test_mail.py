@@ -0,0 +1,140 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import mail as mail_queue
+from core.models import OutboundEmail
+
+User = get_user_model()
+
+LOCMEM_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+@override_settings(EMAIL_BACKEND='core.mail.QueueBackend',
+                   MAIL_QUEUE_BACKEND=LOCMEM_BACKEND,
+                   MAIL_QUEUE_BATCH_SIZE=2,
+                   MAIL_QUEUE_MAX_ATTEMPTS=3,
+                   MAIL_QUEUE_RETRY_DELAY=60)
+class MailQueueTests(TestCase):
+    def send(self, count=1, **kwargs):
+        for number in range(count):
+            message = mail.EmailMultiAlternatives(
+                f'Письмо {number}', 'Текст', 'from@example.com',
+                [f'user{number}@example.com'], **kwargs)
+            message.attach_alternative('<p>Текст</p>', 'text/html')
+            message.send()
+
+    def test_send_only_enqueues(self):
+        self.send(reply_to=['reply@example.com'],
+                  headers={'X-Tag': 'reset'})
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(email.to, 'user0@example.com')
+
+        self.assertEqual(mail_queue.send_batch(), (1, 0))
+        message, = mail.outbox
+        self.assertEqual(message.subject, 'Письмо 0')
+        self.assertEqual(message.reply_to, ['reply@example.com'])
+        self.assertEqual(message.extra_headers, {'X-Tag': 'reset'})
+        self.assertEqual(message.alternatives,
+                         [('<p>Текст</p>', 'text/html')])
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.SENT)
+        self.assertIsNotNone(email.sent_at)
+
+    def test_password_reset_is_queued(self):
+        User.objects.create_user('reader', 'reader@example.com', 'password')
+        response = Client().post(reverse('users:password_reset_form'),
+                                 {'email': 'reader@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('send_queued_mail', stdout=mock.Mock())
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+
+    def test_batches_share_one_connection(self):
+        self.send(3)
+        with mock.patch.object(mail_queue, 'get_connection',
+                               wraps=mail_queue.get_connection) as connect:
+            self.assertEqual(mail_queue.send_batch(), (2, 0))
+            self.assertEqual(mail_queue.send_batch(), (1, 0))
+            self.assertEqual(mail_queue.send_batch(), (0, 0))
+        self.assertEqual(connect.call_count, 2)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failures_are_retried_with_backoff(self):
+        self.send()
+        email = OutboundEmail.objects.get()
+        with mock.patch.object(mail.EmailMessage, 'send',
+                               side_effect=OSError('сервер недоступен')):
+            self.assertEqual(mail_queue.send_batch(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 1)
+            self.assertIn('сервер недоступен', email.last_error)
+            self.assertGreater(email.next_attempt_at,
+                               timezone.now() + timedelta(seconds=50))
+            # До следующей попытки письмо не берётся.
+            self.assertEqual(mail_queue.send_batch(), (0, 0))
+            for _ in range(2):
+                OutboundEmail.objects.update(next_attempt_at=timezone.now())
+                mail_queue.send_batch()
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 3)
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+        self.assertEqual(mail_queue.retry_delay(3), timedelta(seconds=240))
+
+    def test_connection_error_fails_whole_batch(self):
+        self.send(2)
+        with mock.patch.object(mail.get_connection(LOCMEM_BACKEND).__class__,
+                               'open', side_effect=OSError('отказ')):
+            self.assertEqual(mail_queue.send_batch(), (0, 2))
+        self.assertEqual(
+            set(OutboundEmail.objects.values_list('attempts', flat=True)),
+            {1})
+
+    def test_leased_mail_is_not_claimed_twice(self):
+        self.send()
+        self.assertEqual(len(mail_queue.claim(10)), 1)
+        self.assertEqual(mail_queue.claim(10), [])
+
+    def test_attempt_counted_at_claim(self):
+        """Письмо упавшего обработчика не берётся после последней попытки."""
+        self.send()
+        for attempt in range(1, 4):
+            self.assertEqual(len(mail_queue.claim(10)), 1)
+            email = OutboundEmail.objects.get()
+            self.assertEqual(email.attempts, attempt)
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(mail_queue.claim(10), [])
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+        self.assertEqual(email.last_error, mail_queue.LEASE_EXPIRED)
+
+    def test_sent_mail_is_marked_before_batch_ends(self):
+        """Отправленное письмо отмечается сразу, а не в конце пачки."""
+        self.send(2)
+        original = mail.EmailMessage.send
+        states = []
+
+        def send(message, *args, **kwargs):
+            states.append(list(OutboundEmail.objects.order_by('pk')
+                               .values_list('status', flat=True)))
+            return original(message, *args, **kwargs)
+
+        with mock.patch.object(mail.EmailMessage, 'send', send):
+            self.assertEqual(mail_queue.send_batch(), (2, 0))
+        self.assertEqual(states[1], [OutboundEmail.SENT,
+                                     OutboundEmail.PENDING])
+
+    def test_attachments_are_rejected(self):
+        message = mail.EmailMessage('Тема', 'Текст', 'from@example.com',
+                                    ['to@example.com'])
+        message.attach('file.txt', 'data', 'text/plain')
+        with self.assertRaises(ValueError):
+            message.send()
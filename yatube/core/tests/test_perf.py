@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import perf
+from posts.models import Post, User
+
+
+@override_settings(PERF_FLUSH_EVERY=1000, PERF_SLOW_REQUEST_MS=0)
+class PerfMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff',
+                                             is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        perf.reset()
+        self.client = Client()
+
+    def test_requests_are_measured_per_view(self):
+        """Замеры копятся по имени представления."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get('/missing/page/')
+        stats = perf.shared_stats()
+        index = stats['posts:index']
+        self.assertEqual(index['count'], 2)
+        # Страница ленты и карточка поста: промахи, затем попадания.
+        self.assertEqual(index['cache_misses'], 2)
+        self.assertEqual(index['cache_hits'], 2)
+        self.assertGreater(index['queries']['mean'], 0)
+        self.assertGreater(index['template_us']['mean'], 0)
+        self.assertGreater(index['bytes']['mean'], 0)
+        self.assertEqual(sum(index['wall_us']['histogram'].values()), 2)
+        self.assertEqual(stats[perf.UNRESOLVED]['count'], 1)
+
+    @override_settings(PERF_SLOW_REQUEST_MS=1)
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.assertLogs('yatube.perf', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_endpoint_is_staff_only(self):
+        url = reverse('core:perf_stats')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['posts:index']['count'], 1)
@@ -0,0 +1,77 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import routers
+from core.middleware import PIN_COOKIE, PrimaryPinMiddleware
+from posts import background
+from posts.models import Post
+
+REPLICAS = ['replica_0', 'replica_1']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=10)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        routers.reset()
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        routers.reset()
+
+    def middleware(self, view):
+        return PrimaryPinMiddleware(view)
+
+    def test_reads_go_to_replicas(self):
+        self.assertIn(self.router.db_for_read(Post), REPLICAS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_go_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), routers.PRIMARY)
+
+    def test_replica_is_sticky_until_reset(self):
+        """Все чтения запроса идут в одну реплику."""
+        reads = {self.router.db_for_read(Post) for _ in range(20)}
+        self.assertEqual(len(reads), 1)
+        routers.reset()
+        self.assertIsNone(routers._state.replica)
+
+    def test_background_work_resets_pin(self):
+        """Фоновая задача читает основную базу и не оставляет пин потоку."""
+        reads = []
+        background._work('key', lambda: reads.append(
+            self.router.db_for_read(Post)), ())
+        self.assertEqual(reads, [routers.PRIMARY])
+        self.assertFalse(routers.is_pinned())
+        self.assertIn(self.router.db_for_read(Post), REPLICAS)
+
+    def test_reads_after_write_go_to_primary(self):
+        """После записи чтения в том же запросе идут в основную базу."""
+        self.assertEqual(self.router.db_for_write(Post), routers.PRIMARY)
+        self.assertEqual(self.router.db_for_read(Post), routers.PRIMARY)
+
+    def test_write_pins_user_with_cookie(self):
+        def view(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        response = self.middleware(view)(self.factory.post('/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+        self.assertFalse(routers.is_pinned())
+
+    def test_pinned_request_reads_primary(self):
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        middleware = self.middleware(view)
+        plain = middleware(self.factory.get('/'))
+        pinned_request = self.factory.get('/')
+        pinned_request.COOKIES[PIN_COOKIE] = '1'
+        middleware(pinned_request)
+        middleware(self.factory.post('/'))
+        self.assertIn(reads[0], REPLICAS)
+        self.assertEqual(reads[1:], [routers.PRIMARY, routers.PRIMARY])
+        self.assertNotIn(PIN_COOKIE, plain.cookies)
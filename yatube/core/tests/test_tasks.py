@@ -0,0 +1,134 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+from posts import background, cards
+
+CALLS = []
+
+
+def remember(*args):
+    CALLS.append(args)
+
+
+def explode(message):
+    raise RuntimeError(message)
+
+
+@override_settings(TASKS_MAX_ATTEMPTS=2, TASKS_RETRY_DELAY=60)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def run_tasks(self):
+        call_command('run_tasks', processes=0, stdout=mock.Mock())
+
+    def test_deferred_call_runs_in_worker(self):
+        tasks.defer(remember, 1, 'текст', [2])
+        self.assertEqual(CALLS, [])
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'core.tests.test_tasks.remember')
+        self.run_tasks()
+        self.assertEqual(CALLS, [(1, 'текст', [2])])
+        self.assertFalse(Task.objects.exists())
+
+    def test_pending_key_is_deduplicated(self):
+        for value in range(3):
+            tasks.defer(remember, value, key='same')
+        tasks.defer(remember, 'other', key='other')
+        self.assertEqual(Task.objects.count(), 2)
+        # Ключ выполняемой задачи не мешает поставить новую.
+        tasks.claim(1)
+        tasks.defer(remember, 'again', key='same')
+        self.assertEqual(Task.objects.count(), 3)
+
+    def test_higher_priority_runs_first(self):
+        tasks.defer(remember, 'low', priority=tasks.LOW)
+        tasks.defer(remember, 'normal')
+        tasks.defer(remember, 'high', priority=tasks.HIGH)
+        tasks.defer(remember, 'later', priority=tasks.HIGH, delay=60)
+        self.run_tasks()
+        self.assertEqual(CALLS, [('high',), ('normal',), ('low',)])
+        self.assertEqual(Task.objects.get().args, '["later"]')
+
+    def test_failures_are_retried_then_kept(self):
+        tasks.defer(explode, 'сбой')
+        self.assertEqual(tasks.run_batch(), (0, 1))
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertIn('RuntimeError: сбой', task.last_error)
+        self.assertGreater(task.run_at,
+                           timezone.now() + timedelta(seconds=50))
+        self.assertEqual(tasks.run_batch(), (0, 0))
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(tasks.run_batch(), (0, 1))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+
+    def test_failed_retry_yields_to_newer_copy(self):
+        tasks.defer(explode, 'сбой', key='job')
+        claimed, = tasks.claim(1)
+        tasks.defer(explode, 'сбой', key='job')
+        tasks.finish(claimed, 'ошибка')
+        self.assertFalse(Task.objects.filter(pk=claimed.pk).exists())
+        self.assertEqual(Task.objects.filter(key='job').count(), 1)
+
+    def test_abandoned_task_is_claimed_again(self):
+        tasks.defer(remember, 'lost')
+        tasks.claim(1)
+        self.assertEqual(tasks.claim(1), [])
+        Task.objects.update(run_at=timezone.now())
+        task, = tasks.claim(1)
+        self.assertEqual(task.attempts, 2)
+
+    def test_expired_last_attempt_is_failed(self):
+        """Задача, чей обработчик погиб на последней попытке, не висит."""
+        tasks.defer(remember, 'lost', max_attempts=1)
+        tasks.claim(1)
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(tasks.claim(1), [])
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.last_error, tasks.LEASE_EXPIRED)
+
+    def test_broken_pool_records_every_result(self):
+        """Гибель процесса пула не теряет результаты других задач."""
+        tasks.defer(remember, 'ok')
+        tasks.defer(remember, 'crash')
+        done, crashed = Future(), Future()
+        done.set_result(None)
+        crashed.set_exception(BrokenProcessPool('процесс погиб'))
+        pool = mock.Mock()
+        pool.submit.side_effect = [done, crashed]
+        with self.assertRaises(BrokenProcessPool):
+            tasks.run_batch(pool)
+        task = Task.objects.get()
+        self.assertEqual(task.args, '["crash"]')
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertIn('BrokenProcessPool', task.last_error)
+
+    def test_nested_function_is_rejected(self):
+        def local():
+            pass
+        with self.assertRaises(ValueError):
+            tasks.defer(local)
+
+
+@override_settings(BACKGROUND_WORKERS=2, BACKGROUND_QUEUE=True)
+class BackgroundQueueTests(TestCase):
+    def test_background_run_defers_to_task_queue(self):
+        background.run('cards:author:1', cards.invalidate_author, 1,
+                       priority=tasks.LOW)
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'posts.cards.invalidate_author')
+        self.assertEqual(task.key, 'cards:author:1')
+        self.assertEqual(task.priority, tasks.LOW)
+        self.assertEqual(tasks.run_batch(), (1, 0))
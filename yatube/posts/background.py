@@ -0,0 +1,71 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from core import routers, tasks
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = set()
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix='posts-background',
+            )
+        return _executor
+
+
+def _call(key, func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась с ошибкой', key)
+
+
+def _work(key, func, args):
+    # Поток пула живёт дольше запроса: состояние роутера от прошлой
+    # задачи сбрасывается. Работа запущена записью, которую реплика
+    # могла ещё не получить, поэтому читается основная база.
+    routers.reset()
+    routers.pin_primary()
+    try:
+        _call(key, func, args)
+    finally:
+        with _lock:
+            _pending.discard(key)
+        connections.close_all()
+        routers.reset()
+
+
+def _submit(key, func, args):
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    _get_executor().submit(_work, key, func, args)
+
+
+def run(key, func, *args, priority=tasks.NORMAL):
+    """Выполняет func(*args) в пуле потоков после фиксации транзакции.
+
+    Задача с тем же ключом, уже стоящая в очереди, не дублируется.
+    При BACKGROUND_WORKERS = 0 задача выполняется сразу, при
+    BACKGROUND_QUEUE — ставится в очередь задач core.tasks.
+    """
+    if not settings.BACKGROUND_WORKERS:
+        _call(key, func, args)
+        return
+    if settings.BACKGROUND_QUEUE:
+        tasks.defer(func, *args, key=key, priority=priority)
+        return
+    transaction.on_commit(lambda: _submit(key, func, args))
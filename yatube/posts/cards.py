@@ -0,0 +1,85 @@
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core import cache_stats
+
+from . import thumbnails
+from .models import Post
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+# Одна запись на пост: (версия, HTML). Запись удаляется при правке поста,
+# его группы или имени автора; версия страхует от пропущенного удаления
+# (например, варианты картинки сохраняются через update()).
+CARD_KEY = 'posts:card:{}'
+STATS_NAME = 'card'
+
+
+def version(post):
+    """Версия карточки: хеш всего, что в ней выводится."""
+    author, group = post.author, post.group
+    parts = (
+        post.text,
+        post.pub_date.isoformat(),
+        post.image.name or '',
+        post.image_variants,
+        author.username,
+        author.first_name,
+        author.last_name,
+        group.slug if group else '',
+        group.title if group else '',
+    )
+    return hashlib.md5('\0'.join(parts).encode()).hexdigest()
+
+
+def picture_ready(post):
+    """Картинка выводится окончательно: варианты или готовая миниатюра."""
+    return (not post.image or bool(post.image_variants)
+            or thumbnails.ready_thumbnail(post.image) is not None)
+
+
+def _key(post_id):
+    return CARD_KEY.format(post_id)
+
+
+def render_many(posts):
+    """HTML карточек страницы: кеш читается одним get_many."""
+    posts = list(posts)
+    cached = cache.get_many([_key(post.id) for post in posts])
+    cards, fresh = [], {}
+    for post in posts:
+        key, current = _key(post.id), version(post)
+        entry = cached.get(key)
+        hit = entry is not None and entry[0] == current
+        cache_stats.record(STATS_NAME, hit)
+        if hit:
+            cards.append(entry[1])
+            continue
+        html = render_to_string(CARD_TEMPLATE, {'post': post})
+        # Карточку с исходной картинкой вместо миниатюры не запоминаем.
+        if picture_ready(post):
+            fresh[key] = (current, html)
+        cards.append(html)
+    if fresh:
+        cache.set_many(fresh, None)
+    return cards
+
+
+def invalidate(post_ids):
+    """Удаляет карточки постов из кеша."""
+    keys = [_key(post_id) for post_id in post_ids]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_author(author_id):
+    """Карточки всех постов автора: в них выводится его имя."""
+    invalidate(Post.objects.filter(author_id=author_id)
+               .values_list('id', flat=True).iterator())
+
+
+def invalidate_group(group_id):
+    """Карточки постов группы: в них выводится её название."""
+    invalidate(Post.objects.filter(group_id=group_id)
+               .values_list('id', flat=True).iterator())
@@ -0,0 +1,168 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from core import routers
+
+from . import feed_cache, timeline
+from .models import Follow, Post, TimelineEntry
+
+STATE_ATTR = '_conditional_state'
+MODIFIED_KEY = 'posts:feed:modified:{}:{}:{}'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def make_etag(*parts):
+    return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def newest_change(posts):
+    """Время последней правки поста выборки — один запрос по индексу."""
+    return posts.aggregate(newest=Max('updated_at'))['newest']
+
+
+def feed_state(posts, feed):
+    """ETag ленты — из версий кеша, Last-Modified — последнее изменение.
+
+    Изменением считается правка поста или сдвиг версии ленты: удаление
+    поста не оставляет updated_at, но сдвигает версию. Время кешируется
+    до смены версии ленты и потому читается с основной базы.
+    """
+    versions = feed_cache.get_versions(feed_cache.ALL_FEEDS, feed)
+    key = MODIFIED_KEY.format(feed, *versions)
+    last_modified = cache.get(key, False)
+    if last_modified is False:
+        changes = [newest_change(posts.using(routers.PRIMARY)),
+                   *feed_cache.bumped_at(feed_cache.ALL_FEEDS, feed)]
+        last_modified = max(filter(None, changes), default=None)
+        cache.set(key, last_modified, None)
+    return make_etag(feed, *versions), last_modified
+
+
+def follow_state(user):
+    """Состояние ленты подписок по её материализованной части.
+
+    Новые и убранные записи ленты меняют её последний id и размер,
+    правки постов — их последний updated_at; посты «звёзд» учитываются
+    по версиям их профилей. Last-Modified не отдаётся: отписка не
+    оставляет времени изменения, ленту проверяют по ETag.
+    """
+    entries = TimelineEntry.objects.filter(user=user).aggregate(
+        last=Max('id'), total=Count('id'), changed=Max('post__updated_at'))
+    celebrities = timeline.celebrity_ids()
+    followed = []
+    if celebrities:
+        followed = list(Follow.objects.filter(
+            user=user, author__in=celebrities)
+            .order_by('author_id').values_list('author_id', flat=True))
+    versions = feed_cache.get_versions(
+        feed_cache.ALL_FEEDS,
+        *(feed_cache.profile_feed(author) for author in followed))
+    etag = make_etag('follow', user.id, entries['last'], entries['total'],
+                     entries['changed'], *followed, *versions)
+    return etag, None
+
+
+def post_state(post_id):
+    """Пост меняется при правке, комментариях (версия поста), при смене
+    имени автора и числа его постов (версия профиля).
+
+    В Last-Modified входит и время сдвига версий: новый пост автора
+    не трогает updated_at этого поста.
+    """
+    row = (Post.objects.filter(id=post_id)
+           .values_list('version', 'updated_at', 'author_id')
+           .first())
+    if row is None:
+        return None
+    version, updated_at, author_id = row
+    all_version, profile_version = feed_cache.get_versions(
+        feed_cache.ALL_FEEDS, feed_cache.profile_feed(author_id))
+    etag = make_etag('post', post_id, version, all_version, profile_version)
+    changes = [updated_at, *feed_cache.bumped_at(
+        feed_cache.ALL_FEEDS, feed_cache.profile_feed(author_id))]
+    return etag, max(filter(None, changes), default=None)
+
+
+def conditional(state_func):
+    """Ответ 304 по If-None-Match/If-Modified-Since.
+
+    state_func(request, *args, **kwargs) возвращает (etag, last_modified)
+    или None и вызывается один раз на запрос.
+    """
+    def state(request, *args, **kwargs):
+        if not hasattr(request, STATE_ATTR):
+            setattr(request, STATE_ATTR,
+                    state_func(request, *args, **kwargs) or (None, None))
+        return getattr(request, STATE_ATTR)
+
+    def etag(request, *args, **kwargs):
+        return state(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return state(request, *args, **kwargs)[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def for_user(request, state, *extra):
+    """Состояние страницы с учётом посетителя и данных вне ленты (extra).
+
+    Для вошедших и для страниц с extra остаётся только ETag: по дате
+    нельзя заметить, что изменилось то, что видно лишь им (например,
+    подписка), или данные вне ленты (например, число подписчиков).
+    """
+    if state is None:
+        return None
+    etag, last_modified = state
+    if request.user.is_authenticated:
+        return make_etag(etag, request.user.id, *extra), None
+    if extra:
+        return make_etag(etag, *extra), None
+    return etag, last_modified
+
+
+def respond(request, state, render_page):
+    """304, если страница не изменилась, иначе render_page() с валидаторами."""
+    etag, last_modified = state
+    etag = quote_etag(etag) if etag else None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = None
+    if request.method in SAFE_METHODS:
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render_page()
+    if request.method in SAFE_METHODS:
+        if etag and not response.has_header('ETag'):
+            response['ETag'] = etag
+        if timestamp and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+def cache_policy(view):
+    """Страницы для гостей кешируются на краю, для вошедших — приватны."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if (request.method not in SAFE_METHODS
+                or response.status_code not in (200, 304)):
+            return response
+        patch_vary_headers(response, ('Cookie',))
+        # CSRF-токен в странице — это кука конкретного посетителя.
+        if (request.user.is_authenticated
+                or request.META.get('CSRF_COOKIE_USED')):
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=0,
+                                s_maxage=settings.ANONYMOUS_CACHE_SECONDS)
+        return response
+    return wrapper
@@ -0,0 +1,62 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _bump(model, pk, **deltas):
+    """Сдвигает счётчики строки на заданные величины, не уходя ниже нуля."""
+    return model.objects.filter(pk=pk).update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def bump_user(user_id, **deltas):
+    if _bump(UserStats, user_id, **deltas) or min(deltas.values()) < 0:
+        return
+    # Строки счётчиков ещё нет: считаем её целиком по базе.
+    recount_users(User.objects.filter(pk=user_id))
+
+
+def bump_post(post_id, **deltas):
+    _bump(Post, post_id, **deltas)
+
+
+def stats_for(user):
+    """Счётчики пользователя; при отсутствии строки она пересчитывается."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        recount_users(User.objects.filter(pk=user.pk))
+        user.stats = UserStats.objects.get(pk=user.pk)
+        return user.stats
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def recount_users(users):
+    """Пересчитывает по базе счётчики пользователей из выборки."""
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id) for user_id in
+         users.filter(stats__isnull=True).values_list('pk', flat=True)),
+        ignore_conflicts=True,
+    )
+    return UserStats.objects.filter(user__in=users).update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+
+
+def recount_posts(posts):
+    """Пересчитывает по базе число комментариев постов из выборки."""
+    return posts.update(comments_count=_count(Comment, 'post'))
@@ -0,0 +1,158 @@
+import gzip
+import json
+import os
+from collections import namedtuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+
+CHUNK_SIZE = 2000
+STATE_FILE = 'export_state.json'
+FILE_NAME = '{}.jsonl.gz'
+
+# fields: имя в выгрузке -> поле для values(); since — поле даты
+# для инкрементальной выгрузки (None — модель выгружается целиком).
+# Записи совпадают по полям с форматом import_data.
+Export = namedtuple('Export', 'model queryset fields since')
+
+EXPORTS = {
+    'users': Export('user', User.objects.all(), {
+        'id': 'id',
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'email': 'email',
+        'is_active': 'is_active',
+        'date_joined': 'date_joined',
+    }, 'date_joined'),
+    'groups': Export('group', Group.objects.all(), {
+        'id': 'id',
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    }, 'updated_at'),
+    'posts': Export('post', Post.objects.all(), {
+        'id': 'id',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'image': 'image',
+    }, 'updated_at'),
+    'comments': Export('comment', Comment.objects.all(), {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }, 'updated_at'),
+    'follows': Export('follow', Follow.objects.all(), {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    }, None),
+}
+
+
+class ExportError(Exception):
+    """Выгрузку нельзя начать или продолжить."""
+
+
+def rows(export, since=None, after=0, chunk_size=CHUNK_SIZE):
+    """Пачки строк по возрастанию pk: запрос на пачку, память постоянна."""
+    queryset = export.queryset.order_by('pk')
+    if since is not None and export.since is not None:
+        queryset = queryset.filter(**{f'{export.since}__gte': since})
+    names, lookups = zip(*export.fields.items())
+    while True:
+        chunk = list(queryset.filter(pk__gt=after)
+                     .values_list(*lookups)[:chunk_size])
+        if not chunk:
+            return
+        after = chunk[-1][0]
+        yield after, [{'model': export.model, **dict(zip(names, row))}
+                      for row in chunk]
+
+
+def encode(rows):
+    return ''.join(json.dumps(row, cls=DjangoJSONEncoder,
+                              ensure_ascii=False) + '\n'
+                   for row in rows).encode()
+
+
+class Exporter:
+    """Выгрузка моделей в сжатые файлы JSONL с возможностью продолжения.
+
+    Каждая пачка дописывается в файл отдельным членом gzip, после чего
+    в файл состояния записываются последний pk и размер файла. При
+    продолжении файл обрезается до записанного размера, так что пачка,
+    прерванная на середине, не повторяется.
+
+    С since выгружаются строки, изменённые с этого момента: посты,
+    комментарии и группы — по updated_at, пользователи — по дате
+    регистрации. Удаления в выгрузку не попадают.
+    """
+
+    def __init__(self, directory, since=None, names=None, resume=False,
+                 chunk_size=CHUNK_SIZE):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.state_path = os.path.join(directory, STATE_FILE)
+        if resume:
+            self.state = self.load_state()
+            if since is not None and since.isoformat() != self.state['since']:
+                raise ExportError('--since не совпадает с прерванной '
+                                  'выгрузкой')
+        else:
+            self.state = {
+                'since': since.isoformat() if since else None,
+                'started_at': timezone.now().isoformat(),
+                'models': {
+                    name: {'last_pk': 0, 'size': 0, 'rows': 0,
+                           'done': False}
+                    for name in (names or EXPORTS)
+                },
+            }
+        self.since = since
+        if self.state['since'] is not None:
+            self.since = parse_datetime(self.state['since'])
+
+    def load_state(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as stream:
+                return json.load(stream)
+        except FileNotFoundError:
+            raise ExportError(f'нет файла состояния {self.state_path}')
+
+    def save_state(self):
+        temporary = self.state_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as stream:
+            json.dump(self.state, stream, ensure_ascii=False, indent=1)
+        os.replace(temporary, self.state_path)
+
+    def run(self):
+        """Выгружает модели; после каждой пачки отдаёт (модель, строк)."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.save_state()
+        for name, progress in self.state['models'].items():
+            if progress['done']:
+                continue
+            path = os.path.join(self.directory, FILE_NAME.format(name))
+            with open(path, 'ab') as stream:
+                stream.truncate(progress['size'])
+            for last_pk, chunk in rows(EXPORTS[name], self.since,
+                                       progress['last_pk'], self.chunk_size):
+                with open(path, 'ab') as stream:
+                    stream.write(gzip.compress(encode(chunk)))
+                    stream.flush()
+                    os.fsync(stream.fileno())
+                    progress['size'] = stream.tell()
+                progress['last_pk'] = last_pk
+                progress['rows'] += len(chunk)
+                self.save_state()
+                yield name, progress['rows']
+            progress['done'] = True
+            self.save_state()
@@ -0,0 +1,165 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import transaction
+from django.utils import timezone
+
+from core import cache_stats, routers
+
+from .utils import (CURSOR_PARAM, CURSOR_SEPARATOR, POST_ON_PAGE, CursorPage,
+                    CursorPaginator, page_paginator)
+
+# Версия всех лент: меняется, когда устаревают карточки во всех лентах
+# сразу (переименование автора, удаление группы).
+ALL_FEEDS = 'all'
+INDEX_FEED = 'index'
+VERSION_KEY = 'posts:feed:version:{}'
+BUMPED_KEY = 'posts:feed:bumped:{}'
+PAGE_KEY = 'posts:feed:page:{}:{}:{}:{}'
+STATS_NAME = 'feed'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def profile_feed(author_id):
+    return f'profile:{author_id}'
+
+
+def post_feeds(post):
+    """Ленты, в которые попадает пост."""
+    feeds = [INDEX_FEED, profile_feed(post.author_id)]
+    if post.group_id is not None:
+        feeds.append(group_feed(post.group_id))
+    return feeds
+
+
+def _new_version():
+    # Уникальная версия не повторяет ту, что была до вытеснения ключа.
+    return time.time_ns()
+
+
+def get_versions(*feeds):
+    keys = [VERSION_KEY.format(feed) for feed in feeds]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bumped_at(*feeds):
+    """Когда версии лент менялись в последний раз (None — неизвестно)."""
+    times = cache.get_many([BUMPED_KEY.format(feed) for feed in feeds])
+    return [times.get(BUMPED_KEY.format(feed)) for feed in feeds]
+
+
+def _bump(feeds):
+    # Новая версия записывается, а не увеличивается: incr файлового кеша
+    # не атомарен, и два одновременных сдвига дали бы одну версию.
+    now = timezone.now()
+    cache.set_many({BUMPED_KEY.format(feed): now for feed in feeds}, None)
+    cache.set_many({VERSION_KEY.format(feed): _new_version()
+                    for feed in feeds}, None)
+
+
+def bump(*feeds):
+    """Сбрасывает кеш страниц лент, увеличивая их версии.
+
+    Версия меняется сразу и ещё раз после фиксации транзакции: страница,
+    прочитанная до фиксации с новой версией, не переживёт второй сдвиг.
+    """
+    _bump(feeds)
+    transaction.on_commit(lambda: _bump(feeds))
+
+
+def _page_query(request, objects):
+    """Проверенная страница для ключа кеша: (запрос, номер страницы).
+
+    None — номер или курсор некорректны, такую страницу не кешируют.
+    """
+    if CURSOR_PARAM in request.GET:
+        cursor = request.GET.get(CURSOR_PARAM)
+        if not cursor:
+            return f'{CURSOR_PARAM}=', None
+        decoded = CursorPaginator(objects, POST_ON_PAGE).decode_cursor(cursor)
+        if decoded is None:
+            return None
+        direction, values = decoded
+        values = CURSOR_SEPARATOR.join(str(value) for value in values)
+        return f'{CURSOR_PARAM}={direction}{CURSOR_SEPARATOR}{values}', None
+    number = request.GET.get('page') or '1'
+    if not number.isdigit() or int(number) < 1:
+        return None
+    return f'page={int(number)}', int(number)
+
+
+def _page_key(feed, query):
+    all_version, feed_version = get_versions(ALL_FEEDS, feed)
+    query = hashlib.md5(query.encode()).hexdigest()
+    return PAGE_KEY.format(feed, all_version, feed_version, query)
+
+
+def _in_range(page, number):
+    """Страница та, что запрошена: номер не за пределами ленты,
+    курсор не указывает за её конец (пустую страницу не кешируем)."""
+    if number is not None:
+        return page.number == number
+    return bool(page.object_list)
+
+
+def _freeze(page):
+    if isinstance(page, CursorPage):
+        return {
+            'object_list': list(page),
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+    return {
+        'object_list': list(page),
+        'number': page.number,
+        'count': page.paginator.count,
+    }
+
+
+def _thaw(data, objects):
+    if 'number' in data:
+        paginator = Paginator(objects, POST_ON_PAGE)
+        paginator.count = data['count']
+        return Page(data['object_list'], data['number'], paginator)
+    return CursorPage(
+        data['object_list'],
+        CursorPaginator(objects, POST_ON_PAGE),
+        next_cursor=data['next_cursor'],
+        previous_cursor=data['previous_cursor'],
+    )
+
+
+def cached_page(request, feed, objects, count=None):
+    """Страница ленты из кеша; запрос к базе — только при промахе.
+
+    Запись живёт, пока не изменится версия ленты, поэтому читается
+    с основной базы; страницы по некорректному номеру или курсору
+    не кешируются.
+    """
+    checked = _page_query(request, objects)
+    if checked is None:
+        return page_paginator(request, objects, count=count)
+    query, number = checked
+    key = _page_key(feed, query)
+    data = cache.get(key)
+    cache_stats.record(STATS_NAME, data is not None)
+    if data is None:
+        if routers.on_replica():
+            # Число постов тоже прочитано с реплики и могло отстать.
+            count = None
+        page = page_paginator(
+            request, objects.using(routers.PRIMARY), count=count)
+        if _in_range(page, number):
+            cache.set(key, _freeze(page), None)
+        return page
+    return _thaw(data, objects)
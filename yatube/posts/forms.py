@@ -1,4 +1,6 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 
 from .models import Comment, Post
 
@@ -8,6 +10,25 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, rejected_uploads=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rejected_uploads = rejected_uploads
+
+    def clean_image(self):
+        """Проверяет картинку по заголовку, не раскодируя её целиком."""
+        if 'image' in self.rejected_uploads:
+            raise forms.ValidationError(
+                'Файл больше %s.'
+                % filesizeformat(settings.POST_IMAGE_MAX_SIZE))
+        image = self.cleaned_data['image']
+        header = getattr(image, 'image', None)
+        if header is not None:
+            width, height = header.size
+            if width * height > settings.POST_IMAGE_MAX_PIXELS:
+                raise forms.ValidationError(
+                    'Слишком большое разрешение картинки.')
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,337 @@
+import csv
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, feed_cache, timeline
+from .models import Comment, Follow, Group, Post, User
+
+CHUNK_SIZE = 1000
+# Ограничение числа параметров запроса SQLite при выборках по id.
+ID_BATCH_SIZE = 500
+# Порядок загрузки внутри пачки: сначала то, на что ссылаются другие.
+MODELS = ('user', 'group', 'post', 'comment', 'follow')
+FORMATS = ('jsonl', 'csv')
+
+
+class RowError(ValueError):
+    """Строка входных данных, которую нельзя загрузить."""
+
+
+def read_records(stream, fmt, model=None):
+    """Записи из потока JSONL или CSV: пары (номер строки, словарь)."""
+    if fmt == 'csv':
+        rows = enumerate(csv.DictReader(stream), start=2)
+    else:
+        rows = ((number, line) for number, line in enumerate(stream, start=1)
+                if line.strip())
+    for number, row in rows:
+        if fmt != 'csv':
+            try:
+                row = json.loads(row)
+            except ValueError as error:
+                row = {'error': f'некорректный JSON: {error}'}
+            if not isinstance(row, dict):
+                row = {'error': 'ожидался объект JSON'}
+        if model and not row.get('model'):
+            row['model'] = model
+        yield number, row
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def existing_ids(queryset, ids):
+    """id из ids, которые уже есть в queryset, выбранные пачками."""
+    found = set()
+    for batch in chunked(sorted(ids), ID_BATCH_SIZE):
+        found.update(queryset.filter(id__in=batch)
+                     .values_list('id', flat=True))
+    return found
+
+
+def count_follows(user_ids):
+    """Число подписок пользователей, посчитанное пачками."""
+    return sum(Follow.objects.filter(user_id__in=batch).count()
+               for batch in chunked(sorted(user_ids), ID_BATCH_SIZE))
+
+
+@contextmanager
+def keep_dates(model):
+    """bulk_create сохраняет даты из архива вместо auto_now_add."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Загружает пользователей, группы, посты, комментарии и подписки.
+
+    Авторы и группы ищутся по словарям в памяти, каждая пачка
+    сохраняется bulk_create в своей транзакции. Сигналы при этом
+    не срабатывают, поэтому finish() пересчитывает счётчики и ленты.
+    """
+
+    def __init__(self, create_users=False, chunk_size=CHUNK_SIZE,
+                 on_error=None):
+        self.create_users = create_users
+        self.chunk_size = chunk_size
+        self.on_error = on_error
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.created = Counter()
+        self.errors = []
+        self.failed = 0
+        self.rows = 0
+        self.started = time.monotonic()
+        self.touched_users = set()
+        self.touched_posts = set()
+        self.timeline_authors = set()
+
+    @property
+    def rate(self):
+        return self.rows / max(time.monotonic() - self.started, 1e-6)
+
+    def run(self, records):
+        """Загружает записи; после каждой пачки отдаёт число строк."""
+        for chunk in chunked(records, self.chunk_size):
+            self.load_chunk(chunk)
+            yield self.rows
+
+    def load_chunk(self, chunk):
+        self.rows += len(chunk)
+        by_model = defaultdict(list)
+        for number, record in chunk:
+            if 'error' in record:
+                self.reject(number, record, record['error'])
+            elif record.get('model') not in MODELS:
+                self.reject(number, record,
+                            f'неизвестная модель {record.get("model")!r}')
+            else:
+                by_model[record['model']].append((number, record))
+        with transaction.atomic():
+            for model in MODELS:
+                if by_model[model]:
+                    getattr(self, f'load_{model}s')(by_model[model])
+                # Недостающие авторы — после пользователей из самой пачки.
+                if model == 'user' and self.create_users:
+                    self.add_users(by_model)
+
+    def reject(self, number, record, message):
+        self.failed += 1
+        if self.on_error is None:
+            self.errors.append((number, record, message))
+        else:
+            self.on_error(number, record, message)
+
+    def build(self, rows, build_row):
+        """Объекты по строкам; строки с ошибками попадают в отчёт."""
+        objects = []
+        for number, record in rows:
+            try:
+                obj = build_row(record)
+                # Связи уже проверены по словарям: без запроса на строку.
+                obj.clean_fields(exclude=[
+                    field.name for field in obj._meta.fields
+                    if field.is_relation])
+            except RowError as error:
+                self.reject(number, record, str(error))
+            except ValidationError as error:
+                self.reject(number, record, '; '.join(
+                    f'{field}: {" ".join(messages)}'
+                    for field, messages in error.message_dict.items()))
+            else:
+                objects.append(obj)
+        return objects
+
+    def user_id(self, record, field):
+        username = record.get(field)
+        if username not in self.users:
+            raise RowError(f'{field}: нет пользователя {username!r}')
+        return self.users[username]
+
+    def group_id(self, record):
+        slug = record.get('group')
+        if not slug:
+            return None
+        if slug not in self.groups:
+            raise RowError(f'group: нет группы {slug!r}')
+        return self.groups[slug]
+
+    @staticmethod
+    def date(record, field):
+        value = record.get(field)
+        if not value:
+            return timezone.now()
+        try:
+            parsed = parse_datetime(value)
+        except (TypeError, ValueError):
+            parsed = None
+        if parsed is None:
+            raise RowError(f'{field}: некорректная дата {value!r}')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    @staticmethod
+    def integer(record, field):
+        try:
+            return int(record[field])
+        except (KeyError, TypeError, ValueError):
+            raise RowError(f'{field}: ожидалось целое число')
+
+    def add_users(self, by_model):
+        fields = {'post': ('author',), 'comment': ('author',),
+                  'follow': ('user', 'author')}
+        missing = {
+            record.get(field)
+            for model, names in fields.items()
+            for _, record in by_model[model]
+            for field in names
+            if record.get(field) and record.get(field) not in self.users
+        }
+        User.objects.bulk_create(
+            (User(username=username, password=make_password(None))
+             for username in missing),
+            ignore_conflicts=True,
+        )
+        self.created['user'] += len(missing)
+        for batch in chunked(missing, ID_BATCH_SIZE):
+            self.users.update(User.objects.filter(username__in=batch)
+                              .values_list('username', 'id'))
+
+    def load_users(self, rows):
+        seen = set()
+
+        def build_row(record):
+            username = record.get('username')
+            if username in self.users or username in seen:
+                raise RowError(
+                    f'username: пользователь {username!r} уже есть')
+            seen.add(username)
+            return User(username=username,
+                        password=make_password(None),
+                        first_name=record.get('first_name') or '',
+                        last_name=record.get('last_name') or '',
+                        email=record.get('email') or '',
+                        is_active=str(record.get('is_active', True))
+                        .lower() not in ('false', '0'),
+                        date_joined=self.date(record, 'date_joined'))
+
+        users = self.build(rows, build_row)
+        User.objects.bulk_create(users)
+        self.created['user'] += len(users)
+        for batch in chunked([user.username for user in users],
+                             ID_BATCH_SIZE):
+            self.users.update(User.objects.filter(username__in=batch)
+                              .values_list('username', 'id'))
+
+    def load_groups(self, rows):
+        seen = set()
+
+        def build_row(record):
+            slug = record.get('slug')
+            if slug in self.groups or slug in seen:
+                raise RowError(f'slug: группа {slug!r} уже есть')
+            seen.add(slug)
+            return Group(slug=slug, title=record.get('title'),
+                         description=record.get('description', ''))
+
+        groups = self.build(rows, build_row)
+        Group.objects.bulk_create(groups)
+        self.created['group'] += len(groups)
+        self.groups.update(
+            Group.objects.filter(slug__in=[group.slug for group in groups])
+            .values_list('slug', 'id'))
+
+    def load_posts(self, rows):
+        explicit = {int(record['id']) for _, record in rows
+                    if str(record.get('id', '')).isdigit()}
+        taken = existing_ids(Post.objects, explicit)
+
+        def build_row(record):
+            post = Post(author_id=self.user_id(record, 'author'),
+                        group_id=self.group_id(record),
+                        text=record.get('text'),
+                        pub_date=self.date(record, 'pub_date'))
+            if record.get('id'):
+                post.id = self.integer(record, 'id')
+                if post.id in taken:
+                    raise RowError(f'id: пост {post.id} уже есть')
+                taken.add(post.id)
+            return post
+
+        posts = self.build(rows, build_row)
+        with keep_dates(Post):
+            Post.objects.bulk_create(posts)
+        self.created['post'] += len(posts)
+        for post in posts:
+            self.touched_users.add(post.author_id)
+            self.timeline_authors.add(post.author_id)
+
+    def load_comments(self, rows):
+        referenced = {int(record['post']) for _, record in rows
+                      if str(record.get('post', '')).isdigit()}
+        existing = existing_ids(Post.objects, referenced)
+
+        def build_row(record):
+            post_id = self.integer(record, 'post')
+            if post_id not in existing:
+                raise RowError(f'post: нет поста {post_id}')
+            return Comment(post_id=post_id,
+                           author_id=self.user_id(record, 'author'),
+                           text=record.get('text'),
+                           created=self.date(record, 'created'))
+
+        comments = self.build(rows, build_row)
+        with keep_dates(Comment):
+            Comment.objects.bulk_create(comments)
+        self.created['comment'] += len(comments)
+        self.touched_posts.update(comment.post_id for comment in comments)
+
+    def load_follows(self, rows):
+        def build_row(record):
+            follow = Follow(user_id=self.user_id(record, 'user'),
+                            author_id=self.user_id(record, 'author'))
+            if follow.user_id == follow.author_id:
+                raise RowError('нельзя подписаться на самого себя')
+            return follow
+
+        follows = self.build(rows, build_row)
+        users = {follow.user_id for follow in follows}
+        before = count_follows(users)
+        # Повторные подписки отсекает ограничение unique_follow.
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        self.created['follow'] += count_follows(users) - before
+        for follow in follows:
+            self.touched_users.update((follow.user_id, follow.author_id))
+            self.timeline_authors.add(follow.author_id)
+
+    def finish(self):
+        """Пересчитывает то, что обычно обновляют сигналы."""
+        for batch in chunked(sorted(self.touched_users), ID_BATCH_SIZE):
+            counters.recount_users(User.objects.filter(id__in=batch))
+        for batch in chunked(sorted(self.touched_posts), ID_BATCH_SIZE):
+            counters.recount_posts(Post.objects.filter(id__in=batch))
+        timeline.refill(sorted(self.timeline_authors))
+        feed_cache.bump(feed_cache.ALL_FEEDS)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import variants
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт адаптивные варианты картинок постов, у которых их нет'
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='').exclude(image__isnull=True)
+            .filter(image_variants='')
+            .order_by().values_list('image', flat=True).distinct()
+        )
+        built = failed = 0
+        for name in names.iterator():
+            try:
+                variants.generate(name)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+            else:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {built}, с ошибками: {failed}'))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import exporter
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии и подписки '
+            'в файлы <модель>.jsonl.gz')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--since', metavar='datetime',
+                            help='только записи, изменённые с этого момента '
+                                 '(удаления не выгружаются)')
+        parser.add_argument('--models', metavar='name,...',
+                            help=', '.join(exporter.EXPORTS))
+        parser.add_argument('--resume', action='store_true',
+                            help='продолжить прерванную выгрузку')
+        parser.add_argument('--chunk-size', type=int,
+                            default=exporter.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        since = self.parse_since(options['since'])
+        names = None
+        if options['models']:
+            names = options['models'].split(',')
+            unknown = set(names) - set(exporter.EXPORTS)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные модели: {", ".join(sorted(unknown))}')
+        try:
+            export = exporter.Exporter(
+                options['directory'], since=since, names=names,
+                resume=options['resume'], chunk_size=options['chunk_size'])
+            for name, rows in export.run():
+                self.stdout.write(f'{name}: {rows}')
+        except exporter.ExportError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            'Выгрузка завершена; для следующей инкрементальной: '
+            f'--since {export.state["started_at"]}'))
+
+    @staticmethod
+    def parse_since(value):
+        if value is None:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            raise CommandError(f'Некорректная дата: {value}')
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
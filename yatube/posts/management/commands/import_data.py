@@ -0,0 +1,67 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = ('Загружает пользователей, группы, посты, комментарии и '
+            'подписки из JSONL или CSV; у каждой записи поле model: user, '
+            'group, post, comment или follow')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', metavar='path')
+        parser.add_argument('--format', choices=importer.FORMATS,
+                            help='по умолчанию — по расширению файла')
+        parser.add_argument('--model', choices=importer.MODELS,
+                            help='модель для записей без поля model')
+        parser.add_argument('--chunk-size', type=int,
+                            default=importer.CHUNK_SIZE)
+        parser.add_argument('--create-users', action='store_true',
+                            help='создавать недостающих пользователей')
+        parser.add_argument('--errors', metavar='path',
+                            help='куда записать отклонённые строки (JSONL)')
+
+    def handle(self, *args, **options):
+        errors = open(options['errors'], 'w') if options['errors'] else None
+        path = None
+
+        def on_error(number, record, message):
+            self.stderr.write(f'{path}:{number}: {message}')
+            if errors is not None:
+                errors.write(json.dumps(
+                    {'path': path, 'line': number, 'error': message,
+                     'record': record}, ensure_ascii=False) + '\n')
+
+        loader = importer.Importer(create_users=options['create_users'],
+                                   chunk_size=options['chunk_size'],
+                                   on_error=on_error)
+        try:
+            for path in options['paths']:
+                fmt = options['format'] or self.guess_format(path)
+                with open(path, newline='', encoding='utf-8') as stream:
+                    records = importer.read_records(stream, fmt,
+                                                    options['model'])
+                    for rows in loader.run(records):
+                        self.stdout.write(
+                            f'Строк: {rows}, {loader.rate:.0f} строк/с')
+            loader.finish()
+        finally:
+            if errors is not None:
+                errors.close()
+        created = ', '.join(f'{model}: {count}'
+                            for model, count in loader.created.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {loader.rows} за '
+            f'{loader.rows / loader.rate:.1f} с ({loader.rate:.0f} строк/с); '
+            f'создано — {created or "ничего"}; с ошибками: {loader.failed}'))
+
+    @staticmethod
+    def guess_format(path):
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        if extension not in importer.FORMATS:
+            raise CommandError(
+                f'{path}: неизвестный формат, укажите --format')
+        return extension
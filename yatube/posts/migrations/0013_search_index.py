@@ -0,0 +1,95 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:10
+
+from django.db import migrations
+
+# Полнотекстовый индекс SQLite FTS5 по текстам постов и комментариев.
+# Строка поста имеет rowid = 2 * id, строка комментария — 2 * id + 1;
+# индекс поддерживается триггерами, поэтому учитывает и bulk_create,
+# и update() в обход моделей.
+CREATE_SQL = (
+    """
+    CREATE VIRTUAL TABLE posts_search USING fts5(
+        body, post_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_search_post_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_search (rowid, body, post_id)
+        VALUES (2 * new.id, new.text, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_post_update AFTER UPDATE OF text
+    ON posts_post
+    BEGIN
+        UPDATE posts_search SET body = new.text WHERE rowid = 2 * new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_post_delete AFTER DELETE ON posts_post
+    BEGIN
+        DELETE FROM posts_search WHERE rowid = 2 * old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_comment_insert AFTER INSERT ON posts_comment
+    BEGIN
+        INSERT INTO posts_search (rowid, body, post_id)
+        VALUES (2 * new.id + 1, new.text, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_comment_update AFTER UPDATE OF text
+    ON posts_comment
+    BEGIN
+        UPDATE posts_search SET body = new.text
+        WHERE rowid = 2 * new.id + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_comment_delete AFTER DELETE
+    ON posts_comment
+    BEGIN
+        DELETE FROM posts_search WHERE rowid = 2 * old.id + 1;
+    END
+    """,
+    """
+    INSERT INTO posts_search (rowid, body, post_id)
+    SELECT 2 * id, text, id FROM posts_post
+    """,
+    """
+    INSERT INTO posts_search (rowid, body, post_id)
+    SELECT 2 * id + 1, text, post_id FROM posts_comment
+    """,
+)
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS posts_search_post_insert',
+    'DROP TRIGGER IF EXISTS posts_search_post_update',
+    'DROP TRIGGER IF EXISTS posts_search_post_delete',
+    'DROP TRIGGER IF EXISTS posts_search_comment_insert',
+    'DROP TRIGGER IF EXISTS posts_search_comment_update',
+    'DROP TRIGGER IF EXISTS posts_search_comment_delete',
+    'DROP TABLE IF EXISTS posts_search',
+)
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:31
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_pub_date(apps, schema_editor):
+    """Записи ленты получают дату своего поста."""
+    Post = apps.get_model('posts', 'Post')
+    apps.get_model('posts', 'TimelineEntry').objects.update(
+        pub_date=Subquery(Post.objects.filter(id=OuterRef('post_id'))
+                          .values('pub_date')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_change_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timelineentry',
+            name='pub_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата публикации'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_pub_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='timeline_user_date_idx'),
+        ),
+    ]
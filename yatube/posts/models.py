@@ -1,10 +1,75 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 User = get_user_model()
 
 
-class Group(models.Model):
+class AtomicSaveMixin:
+    """Сохранение и обработчики post_save выполняются в одной транзакции."""
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class TrackedQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """Обновление запросом тоже считается изменением строк."""
+        kwargs.setdefault('updated_at', timezone.now())
+        kwargs.setdefault('version', models.F('version') + 1)
+        return super().update(**kwargs)
+
+    def touch(self):
+        """Отмечает строки изменёнными, не меняя данных."""
+        return self.update()
+
+    def changed_since(self, when):
+        """Строки, изменённые начиная с when, в порядке изменения.
+
+        Граница включается: строку, полученную повторно, потребитель
+        узнаёт по неизменившемуся version. Удалённые строки сюда не
+        попадают: журнала удалений нет, и потребителю, которому они
+        важны, нужно сверять множества pk целиком.
+        """
+        return self.filter(updated_at__gte=when).order_by('updated_at', 'pk')
+
+
+class TrackedModel(models.Model):
+    """Время и номер последнего изменения строки.
+
+    Удаление следов не оставляет — см. TrackedQuerySet.changed_since.
+    """
+    updated_at = models.DateTimeField(auto_now=True,
+                                      db_index=True,
+                                      verbose_name='Изменено')
+    version = models.PositiveIntegerField(default=1,
+                                          editable=False,
+                                          verbose_name='Версия')
+
+    objects = TrackedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        # Увеличение в базе не теряет одновременных правок; новое
+        # значение прочитается из базы при первом обращении.
+        self.version = models.F('version') + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at',
+                                       'version'}
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            del self.version
+
+
+class Group(TrackedModel):
     title = models.CharField(max_length=200,
                              verbose_name='Название',
                              help_text='Введите название')
@@ -19,7 +84,27 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class PostQuerySet(TrackedQuerySet):
+    # Поля, которые выводятся в карточке поста в лентах.
+    FEED_FIELDS = (
+        'text',
+        'pub_date',
+        'image',
+        'image_variants',
+        'comments_count',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group__title',
+        'group__slug',
+    )
+
+    def feed(self):
+        """Посты для лент: автор и группа в одном запросе."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+
+class Post(AtomicSaveMixin, TrackedModel):
     text = models.TextField(verbose_name='Текст поста',
                             help_text='Введите текст поста')
     pub_date = models.DateTimeField(auto_now_add=True,
@@ -41,6 +126,17 @@ class Post(models.Model):
                               upload_to='posts/',
                               blank=True,
                               null=True)
+    # Описание вариантов картинки разных размеров и форматов (JSON),
+    # заполняется фоновой обработкой после загрузки.
+    image_variants = models.TextField(blank=True,
+                                      default='',
+                                      editable=False)
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев')
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
@@ -49,7 +145,7 @@ class Post(models.Model):
         return self.text[:15]
 
 
-class Comment(models.Model):
+class Comment(AtomicSaveMixin, TrackedModel):
     post = models.ForeignKey(Post,
                              on_delete=models.CASCADE,
                              related_name='comments',
@@ -64,12 +160,16 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
                              related_name='follower',
@@ -78,3 +178,59 @@ class Follow(models.Model):
                                on_delete=models.CASCADE,
                                related_name='following',
                                verbose_name='Интересный автор')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+            models.CheckConstraint(check=~models.Q(user=models.F('author')),
+                                   name='prevent_self_follow'),
+        ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя (fan-out при публикации)."""
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='timeline',
+                             verbose_name='Читатель')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline_entries',
+                             verbose_name='Пост')
+    # Копия даты поста: лента читается по индексу без соединения
+    # с постами и без сортировки.
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_date_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляемые при создании и удалении записей."""
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='stats',
+                                verbose_name='Пользователь')
+    posts_count = models.PositiveIntegerField(default=0,
+                                              verbose_name='Постов')
+    followers_count = models.PositiveIntegerField(default=0,
+                                                  db_index=True,
+                                                  verbose_name='Подписчиков')
+    following_count = models.PositiveIntegerField(default=0,
+                                                  verbose_name='Подписок')
+
+    def __str__(self):
+        return str(self.user)
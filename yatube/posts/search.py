@@ -0,0 +1,84 @@
+import re
+from urllib.parse import urlencode
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+
+from .models import Post
+from .utils import POST_ON_PAGE
+
+QUERY_PARAM = 'q'
+# Ограничение выдачи: ранжирование идёт по всем совпадениям сразу.
+SEARCH_MAX_RESULTS = 1000
+SEARCH_MAX_TERMS = 10
+# Через столько дней вес поста по свежести падает вдвое.
+SEARCH_RECENCY_DAYS = 30
+# Совпадение в комментарии весит меньше совпадения в тексте поста.
+COMMENT_WEIGHT = 0.5
+TERM_RE = re.compile(r'\w+')
+
+# rank в FTS5 — отрицательный bm25: чем меньше, тем релевантнее.
+RANKED_SQL = """
+    SELECT found.post_id
+    FROM (
+        SELECT post_id,
+               MIN(CASE WHEN rowid % 2 = 0 THEN rank
+                        ELSE rank * %s END) AS relevance
+        FROM posts_search
+        WHERE posts_search MATCH %s
+        GROUP BY post_id
+    ) AS found
+    JOIN posts_post ON posts_post.id = found.post_id
+    ORDER BY found.relevance / (
+        1 + (julianday('now') - julianday(posts_post.pub_date)) / %s
+    ), posts_post.id DESC
+    LIMIT %s
+"""
+
+
+def terms(text):
+    """Слова запроса без операторов FTS5."""
+    return TERM_RE.findall(text or '')[:SEARCH_MAX_TERMS]
+
+
+def match_expression(words):
+    """Выражение MATCH: все слова, каждое — как префикс."""
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def ranked_ids(words):
+    """id постов по убыванию релевантности с поправкой на свежесть."""
+    if not words:
+        return []
+    if connection.vendor != 'sqlite':
+        return _fallback_ids(words)
+    with connection.cursor() as cursor:
+        cursor.execute(RANKED_SQL, [COMMENT_WEIGHT, match_expression(words),
+                                    SEARCH_RECENCY_DAYS, SEARCH_MAX_RESULTS])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_ids(words):
+    # Без FTS5 — поиск подстрокой, только по свежести.
+    condition = Q()
+    for word in words:
+        condition &= (Q(text__icontains=word)
+                      | Q(comments__text__icontains=word))
+    return list(Post.objects.filter(condition).distinct()
+                .order_by('-pub_date', '-id')
+                .values_list('id', flat=True)[:SEARCH_MAX_RESULTS])
+
+
+def search_page(request, query):
+    """Страница результатов поиска в порядке ранжирования."""
+    paginator = Paginator(ranked_ids(terms(query)), POST_ON_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.feed().in_bulk(page.object_list)
+    page.object_list = [posts[pk] for pk in page.object_list if pk in posts]
+    return page
+
+
+def page_query(query):
+    """Префикс ссылок пагинатора, сохраняющий поисковый запрос."""
+    return urlencode({QUERY_PARAM: query}) + '&'
@@ -0,0 +1,135 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core import tasks
+
+from . import background, cards, counters, feed_cache, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+# Поля автора и группы, которые выводятся в карточках постов.
+USER_CARD_FIELDS = ('username', 'first_name', 'last_name')
+GROUP_CARD_FIELDS = ('title', 'slug')
+CARD_CHANGED_ATTR = '_card_fields_changed'
+
+
+def mark_card_change(instance, fields, update_fields):
+    """Запоминает, меняет ли сохранение поля, видные в карточках.
+
+    Пароль, last_login, флаги и описание группы карточки не меняют,
+    и сбрасывать из-за них кеш всех лент незачем.
+    """
+    changed = False
+    if instance.pk is not None and (
+            update_fields is None or set(update_fields) & set(fields)):
+        old = (type(instance)._default_manager.filter(pk=instance.pk)
+               .values_list(*fields).first())
+        changed = old is not None and old != tuple(
+            getattr(instance, field) for field in fields)
+    setattr(instance, CARD_CHANGED_ATTR, changed)
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, update_fields, **kwargs):
+    mark_card_change(instance, USER_CARD_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif instance.__dict__.pop(CARD_CHANGED_ATTR, False):
+        # Имя автора выводится в карточках всех лент.
+        feed_cache.bump(feed_cache.ALL_FEEDS)
+        # Постов у автора может быть много: карточки удаляются в фоне,
+        # а до этого устаревшие отсекает их версия.
+        background.run(f'cards:author:{instance.pk}',
+                       cards.invalidate_author, instance.pk,
+                       priority=tasks.LOW)
+
+
+@receiver(pre_save, sender=Post)
+def post_moving(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    old = Post.objects.filter(pk=instance.pk).only('author', 'group').first()
+    if old is not None:
+        feed_cache.bump(*feed_cache.post_feeds(old))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    feed_cache.bump(*feed_cache.post_feeds(instance))
+    if not created:
+        # Правка поста в post_edit или смена группы в админке.
+        cards.invalidate([instance.pk])
+    if created:
+        counters.bump_user(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    feed_cache.bump(*feed_cache.post_feeds(instance))
+    cards.invalidate([instance.pk])
+    counters.bump_user(instance.author_id, posts_count=-1)
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, update_fields, **kwargs):
+    mark_card_change(instance, GROUP_CARD_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if instance.__dict__.pop(CARD_CHANGED_ATTR, False):
+        # Название группы выводится в карточках главной и профилей.
+        feed_cache.bump(feed_cache.ALL_FEEDS)
+        background.run(f'cards:group:{instance.pk}',
+                       cards.invalidate_group, instance.pk,
+                       priority=tasks.LOW)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления у постов уже не будет группы, по которой их найти;
+    # поле group обнулится запросом в обход save().
+    cards.invalidate_group(instance.pk)
+    Post.objects.filter(group_id=instance.pk).touch()
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.ALL_FEEDS)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.user_id, following_count=1)
+        counters.bump_user(instance.author_id, followers_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.user_id, following_count=-1)
+    counters.bump_user(instance.author_id, followers_count=-1)
+    timeline.trim(instance.user_id, instance.author_id)
+    if timeline.left_celebrities(instance.author_id):
+        # Посты «звезды» читались без раскладки: раскладываем их, пока
+        # лента ещё подмешивает их при чтении из кеша списка «звёзд».
+        background.run(f'timeline:refill:{instance.author_id}',
+                       timeline.refill, [instance.author_id])
@@ -0,0 +1,25 @@
+from django import template
+
+from posts import thumbnails, variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image):
+    """Готовая миниатюра картинки или сама картинка, пока миниатюры нет."""
+    thumbnail = thumbnails.ready_thumbnail(image)
+    if thumbnail is None:
+        thumbnails.schedule(image)
+        return image
+    return thumbnail
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """Картинка поста: адаптивные варианты или миниатюра, пока их нет."""
+    picture = variants.picture(post)
+    thumbnail = None
+    if picture is None and post.image:
+        thumbnail = post_thumbnail(post.image)
+    return {'picture': picture, 'thumbnail': thumbnail}
@@ -0,0 +1,157 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import cards, feed_cache
+
+from ..models import Follow, Group, Post, User
+
+
+class PostCardTests(TestCase):
+    """Карточки постов общие для всех лент и отрисовываются один раз."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def feed_post(self):
+        return Post.objects.feed().get(pk=self.post.pk)
+
+    def render(self):
+        return cards.render_many([self.feed_post()])[0]
+
+    def is_cached(self):
+        return cache.get(cards.CARD_KEY.format(self.post.pk)) is not None
+
+    def test_feeds_use_shared_card(self):
+        """Все ленты выводят одну и ту же карточку поста."""
+        card = self.render()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=Тестовый',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), card)
+
+    def test_unchanged_card_not_rendered_again(self):
+        """Повторная отрисовка неизменённой карточки берётся из кеша."""
+        first = self.render()
+        with mock.patch.object(cards, 'render_to_string') as render:
+            self.assertEqual(self.render(), first)
+        render.assert_not_called()
+
+    def test_page_cards_read_with_one_get_many(self):
+        """Карточки страницы читаются из кеша одним обращением."""
+        other = Post.objects.create(text='Второй пост', author=self.author)
+        posts = list(Post.objects.feed())
+        cards.render_many(posts)
+        with mock.patch.object(cards.cache, 'get_many',
+                               wraps=cards.cache.get_many) as get_many:
+            html = cards.render_many(posts)
+        get_many.assert_called_once()
+        self.assertEqual(len(html), 2)
+        self.assertIn(other.text, html[0])
+
+    def test_change_without_signal_changes_card_version(self):
+        """Правка через update() даёт новую версию карточки."""
+        self.render()
+        version = cards.version(self.feed_post())
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        self.assertNotEqual(cards.version(self.feed_post()), version)
+        self.assertIn('Новый текст', self.render())
+
+    def test_post_edit_invalidates_card(self):
+        """post_edit удаляет карточку поста из кеша."""
+        self.render()
+        author = Client()
+        author.force_login(self.author)
+        author.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Исправленный текст', 'group': ''})
+        self.assertFalse(self.is_cached())
+        html = self.render()
+        self.assertIn('Исправленный текст', html)
+        self.assertNotIn(self.group.title, html)
+
+    def test_admin_group_change_invalidates_card(self):
+        """Смена группы в списке постов админки удаляет карточку."""
+        self.render()
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        other = Group.objects.create(title='Другая группа', slug='other',
+                                     description='Описание')
+        client = Client()
+        client.force_login(admin)
+        client.post(reverse('admin:posts_post_changelist'), data={
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-0-id': str(self.post.pk),
+            'form-0-group': str(other.pk),
+            '_save': 'Сохранить',
+        })
+        self.assertFalse(self.is_cached())
+        self.assertIn(other.title, self.render())
+
+    @override_settings(BACKGROUND_WORKERS=0)
+    def test_rename_invalidates_author_and_group_cards(self):
+        """Смена имени автора или названия группы удаляет карточки."""
+        self.render()
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        self.assertFalse(self.is_cached())
+        self.assertIn('Алексей Толстой', self.render())
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertFalse(self.is_cached())
+        self.assertIn('Новое название', self.render())
+
+    @override_settings(BACKGROUND_WORKERS=0)
+    def test_other_changes_keep_cards_and_feeds(self):
+        """Пароль и описание группы не сбрасывают карточки и ленты."""
+        self.render()
+        version = feed_cache.get_versions(feed_cache.ALL_FEEDS)
+        author = User.objects.get(pk=self.author.pk)
+        author.set_password('new-password')
+        author.save()
+        author.is_staff = True
+        author.save(update_fields=['is_staff'])
+        group = Group.objects.get(pk=self.group.pk)
+        group.description = 'Новое описание'
+        group.save()
+        self.assertTrue(self.is_cached())
+        self.assertEqual(feed_cache.get_versions(feed_cache.ALL_FEEDS),
+                         version)
+
+    def test_card_without_thumbnail_not_cached(self):
+        """Карточку с картинкой без миниатюры рисуют, пока её нет."""
+        post = self.feed_post()
+        post.image.name = 'posts/missing.gif'
+        with mock.patch.object(cards.thumbnails, 'ready_thumbnail',
+                               return_value=None):
+            self.assertFalse(cards.picture_ready(post))
+            with mock.patch.object(cards.cache, 'set_many') as set_many:
+                cards.render_many([post])
+        set_many.assert_not_called()
@@ -0,0 +1,188 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from posts import conditional, timeline
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalResponseTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        self.profile_url = self.pages[2]
+        # Страница профиля показывает счётчики вне ленты — у неё нет даты.
+        self.dated_pages = tuple(url for url in self.pages
+                                 if url != self.profile_url)
+
+    def revalidate(self, client, url):
+        """Код ответа на повторный запрос с ETag первого."""
+        etag = client.get(url)['ETag']
+        return lambda: client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_unchanged_pages_return_304(self):
+        for client in (self.guest_client, self.authorized_client):
+            for url in self.pages:
+                with self.subTest(url=url):
+                    self.assertEqual(self.revalidate(client, url)(), 304)
+
+    def test_guest_pages_revalidate_by_date(self):
+        for url in self.dated_pages:
+            with self.subTest(url=url):
+                last_modified = self.guest_client.get(url)['Last-Modified']
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_feed_date_moves_forward_on_edit_and_delete(self):
+        """Правка или удаление поста не дают 304 по старой дате ленты."""
+        older = Post.objects.create(author=self.author, group=self.group,
+                                    text='Старый пост')
+        Post.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        cache.clear()
+        feeds = self.dated_pages[:-1]
+        dates = {url: self.guest_client.get(url)['Last-Modified']
+                 for url in feeds}
+        older.text = 'Правка'
+        older.save()
+        Post.objects.filter(pk=older.pk).update(
+            updated_at=timezone.now() - timedelta(days=1))
+        for action in (lambda: None, Post.objects.get(pk=older.pk).delete):
+            action()
+            for url in feeds:
+                with self.subTest(url=url):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=dates[url])
+                    self.assertEqual(response.status_code, 200)
+
+    def test_profile_has_no_date(self):
+        """Подписка не меняет дату ленты, поэтому профиль проверяют по ETag."""
+        response = self.guest_client.get(self.profile_url)
+        self.assertNotIn('Last-Modified', response)
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.guest_client.get(
+            self.profile_url,
+            HTTP_IF_MODIFIED_SINCE=http_date(timezone.now().timestamp()))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['author'].stats.followers_count, 1)
+
+    def test_post_date_moves_on_new_post_of_author(self):
+        """Новый пост автора меняет число его постов на странице поста."""
+        Post.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        cache.clear()
+        url = self.pages[-1]
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        self.assertEqual(self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['post_num'], 2)
+
+    def test_changes_invalidate_pages(self):
+        """Правка поста и новый комментарий меняют ETag страниц."""
+        checks = [self.revalidate(self.guest_client, url)
+                  for url in self.pages]
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка'
+        post.save()
+        for url, check in zip(self.pages, checks):
+            with self.subTest(url=url):
+                self.assertEqual(check(), 200)
+        check = self.revalidate(self.guest_client, self.pages[-1])
+        Comment.objects.create(post=post, author=self.user, text='Ответ')
+        self.assertEqual(check(), 200)
+
+    def test_users_get_own_etags(self):
+        """Вошедшие не получают 304 на ETag гостя или чужой подписки."""
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        guest_etag = self.guest_client.get(url)['ETag']
+        response = self.authorized_client.get(url,
+                                              HTTP_IF_NONE_MATCH=guest_etag)
+        self.assertEqual(response.status_code, 200)
+        check = self.revalidate(self.authorized_client, url)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(check(), 200)
+
+    def test_cache_control(self):
+        """Гостевые страницы кешируются на краю, страницы вошедших — нет."""
+        for url in self.pages:
+            with self.subTest(url=url):
+                guest = self.guest_client.get(url)
+                self.assertIn('public', guest['Cache-Control'])
+                self.assertIn('s-maxage', guest['Cache-Control'])
+                self.assertIn('Cookie', guest['Vary'])
+                self.assertNotIn('csrftoken', guest.cookies)
+                user = self.authorized_client.get(url)
+                self.assertIn('private', user['Cache-Control'])
+                self.assertNotIn('Last-Modified', user)
+
+    def test_missing_post_returns_404(self):
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, 404)
+
+
+class FollowStateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_queries_do_not_depend_on_follows(self):
+        """Состояние ленты читается без перебора авторов подписок."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(author=self.author, text='Пост')
+        conditional.follow_state(self.user)
+        User.objects.bulk_create(
+            User(username=f'author_{number}') for number in range(600))
+        Follow.objects.bulk_create(
+            Follow(user=self.user, author=author) for author in
+            User.objects.filter(username__startswith='author_'))
+        with self.assertNumQueries(1):
+            conditional.follow_state(self.user)
+
+    def test_state_follows_timeline_and_celebrities(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        states = [conditional.follow_state(self.user)[0]]
+        post = Post.objects.create(author=self.author, text='Пост')
+        states.append(conditional.follow_state(self.user)[0])
+        post.text = 'Правка'
+        post.save()
+        states.append(conditional.follow_state(self.user)[0])
+        with mock.patch.object(timeline, 'FANOUT_LIMIT', 0):
+            cache.clear()
+            states.append(conditional.follow_state(self.user)[0])
+            Post.objects.create(author=self.author, text='Пост звезды')
+            states.append(conditional.follow_state(self.user)[0])
+        self.assertEqual(len(set(states)), len(states))
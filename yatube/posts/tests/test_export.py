@@ -0,0 +1,110 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts import exporter
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ExportDataTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [Post.objects.create(author=cls.author, group=cls.group,
+                                         text=f'Пост {i}') for i in range(5)]
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self, *args):
+        call_command('export_data', self.directory, '--chunk-size', '2',
+                     *args, stdout=StringIO())
+
+    def read(self, name):
+        path = os.path.join(self.directory, f'{name}.jsonl.gz')
+        with gzip.open(path, 'rt', encoding='utf-8') as stream:
+            return [json.loads(line) for line in stream]
+
+    def test_export_all_models(self):
+        self.export()
+        posts = self.read('posts')
+        self.assertEqual([post['text'] for post in posts],
+                         [f'Пост {i}' for i in range(5)])
+        self.assertEqual(posts[0]['author'], 'author')
+        self.assertEqual(posts[0]['group'], 'group')
+        self.assertEqual(posts[0]['model'], 'post')
+        self.assertEqual(self.read('comments')[0]['post'], self.posts[0].id)
+        self.assertEqual(self.read('follows')[0]['user'], 'reader')
+        self.assertEqual(self.read('groups')[0]['slug'], 'group')
+        self.assertEqual(len(self.read('users')), 2)
+        self.assertNotIn('password', self.read('users')[0])
+
+    def test_incremental_export(self):
+        """Инкрементальная выгрузка берёт изменённые, а не новые записи."""
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[:3]]) \
+            .update(updated_at=timezone.now() - timedelta(days=10))
+        Post.objects.filter(pk=self.posts[4].pk) \
+            .update(pub_date=timezone.now() - timedelta(days=10))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        self.export('--since', since, '--models', 'posts')
+        self.assertEqual([post['text'] for post in self.read('posts')],
+                         ['Пост 3', 'Пост 4'])
+
+    def test_export_can_be_imported(self):
+        """Все файлы выгрузки, включая пользователей, принимает import_data."""
+        self.export()
+        paths = []
+        for name in ('users', 'groups', 'posts', 'comments', 'follows'):
+            path = os.path.join(self.directory, f'{name}.jsonl')
+            with open(path, 'w', encoding='utf-8') as stream:
+                stream.writelines(json.dumps(record) + '\n'
+                                  for record in self.read(name))
+            paths.append(path)
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        err = StringIO()
+        call_command('import_data', *paths, stdout=StringIO(), stderr=err)
+        self.assertEqual(err.getvalue(), '')
+        self.assertEqual(Post.objects.filter(group__slug='group').count(), 5)
+        self.assertEqual(Comment.objects.get().author.username, 'reader')
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader', author__username='author').exists())
+
+    def test_resume_after_interruption(self):
+        """Прерванная выгрузка продолжается без потерь и повторов."""
+        original = exporter.encode
+        calls = []
+
+        def failing(rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return original(rows)
+
+        with mock.patch('posts.exporter.encode', failing):
+            with self.assertRaises(KeyboardInterrupt):
+                self.export('--models', 'posts')
+        self.assertEqual(len(self.read('posts')), 2)
+        self.export('--resume')
+        self.assertEqual([post['text'] for post in self.read('posts')],
+                         [f'Пост {i}' for i in range(5)])
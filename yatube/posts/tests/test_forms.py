@@ -1,10 +1,15 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.models import Group, Post, User
 
@@ -164,3 +169,73 @@ class PostCreateFormTests(TestCase):
         self.post.refresh_from_db()
         self.assertEqual(self.post.text, form_data['text'])
         self.assertEqual(self.post.group.id, form_data['group'])
+
+    def upload(self, name, content, content_type='image/png'):
+        return self.author.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(name, content, content_type),
+            },
+        )
+
+    @staticmethod
+    def png(size):
+        output = BytesIO()
+        Image.new('RGB', size, color=(200, 0, 0)).save(output, 'PNG')
+        return output.getvalue()
+
+    @override_settings(BACKGROUND_WORKERS=0, POST_IMAGE_MAX_SIDE=16)
+    def test_shrink_applies_exif_orientation(self):
+        """Уменьшенное фото поворачивается по EXIF, а не ложится боком."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        output = BytesIO()
+        Image.new('RGB', (64, 32)).save(output, 'JPEG', exif=exif)
+        self.upload('rotated.jpg', output.getvalue(), 'image/jpeg')
+        post = Post.objects.latest('pk')
+        with post.image.open() as stored:
+            image = Image.open(stored)
+            self.assertEqual(image.size, (8, 16))
+            self.assertNotIn(0x0112, image.getexif())
+
+    def test_create_post_saves_image(self):
+        """Картинка, загруженная при создании поста, сохраняется."""
+        self.upload('created.png', self.png((4, 4)))
+        post = Post.objects.latest('pk')
+        self.assertTrue(post.image.name.startswith('posts/created'))
+
+    @override_settings(POST_IMAGE_MAX_SIZE=64)
+    def test_oversized_upload_rejected(self):
+        """Файл больше предельного размера не принимается."""
+        posts_count = Post.objects.count()
+        response = self.upload('big.png', self.png((64, 64)))
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertTrue(response.context['form'].has_error('image'))
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_image_resolution_checked_by_header(self):
+        """Разрешение картинки проверяется по заголовку файла."""
+        posts_count = Post.objects.count()
+        response = self.upload('wide.png', self.png((20, 20)))
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertTrue(response.context['form'].has_error('image'))
+
+    def test_not_image_rejected(self):
+        """Файл, не являющийся картинкой, не принимается."""
+        response = self.upload('fake.png', b'not an image')
+        self.assertTrue(response.context['form'].has_error('image'))
+
+    @override_settings(BACKGROUND_WORKERS=0, POST_IMAGE_MAX_SIDE=16)
+    def test_large_image_shrunk_after_upload(self):
+        """Слишком большая картинка уменьшается после загрузки."""
+        with mock.patch.object(default_storage, 'delete') as delete:
+            self.upload('large.png', self.png((64, 32)))
+        delete.assert_not_called()
+        post = Post.objects.latest('pk')
+        with post.image.open() as stored:
+            self.assertEqual(Image.open(stored).size, (16, 8))
+        directory = os.path.dirname(post.image.path)
+        self.assertEqual(
+            [name for name in os.listdir(directory)
+             if name.startswith('tmp')], [])
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails, variants
+
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = Client()
+        self.author.force_login(self.user)
+
+    def upload_image(self, name):
+        post = Post.objects.create(author=self.user, text='Пост')
+        self.author.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+            })
+        post.refresh_from_db()
+        return post
+
+    def detail_content(self, post):
+        response = self.author.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        return response.content.decode()
+
+    @override_settings(BACKGROUND_WORKERS=0)
+    def test_variants_generated_on_upload(self):
+        """Варианты картинки создаются при загрузке и выводятся в srcset."""
+        post = self.upload_image('ready.gif')
+        self.assertTrue(post.image_variants)
+        picture = variants.picture(post)
+        self.assertEqual(picture['width'], max(variants.VARIANT_WIDTHS))
+        content = self.detail_content(post)
+        self.assertIn('<picture>', content)
+        self.assertIn(picture['srcset'], content)
+        for width in variants.VARIANT_WIDTHS:
+            self.assertIn(f' {width}w', content)
+
+    @override_settings(BACKGROUND_WORKERS=0)
+    def test_thumbnail_used_without_variants(self):
+        """Без вариантов выводится миниатюра, созданная в фоне."""
+        post = self.upload_image('legacy.gif')
+        Post.objects.filter(pk=post.pk).update(image_variants='')
+        self.detail_content(post)
+        thumbnail = thumbnails.ready_thumbnail(post.image)
+        self.assertIsNotNone(thumbnail)
+        self.assertIn(thumbnail.url, self.detail_content(post))
+
+    def test_pending_image_falls_back_to_original(self):
+        """Пока обработка не завершилась, выводится исходная картинка."""
+        post = self.upload_image('pending.gif')
+        self.assertEqual(post.image_variants, '')
+        self.assertIsNone(thumbnails.ready_thumbnail(post.image))
+        self.assertIn(post.image.url, self.detail_content(post))
+
+    @override_settings(DB_LOCKED_RETRY_DELAY=0)
+    def test_retry_does_not_orphan_upload(self):
+        """Повтор создания поста не оставляет копию картинки без поста."""
+        insert = Post._do_insert
+        calls = []
+
+        def locked_once(post, *args, **kwargs):
+            calls.append(post)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return insert(post, *args, **kwargs)
+
+        with mock.patch.object(Post, '_do_insert', autospec=True,
+                               side_effect=locked_once):
+            self.author.post(reverse('posts:post_create'), data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile('retry.gif', SMALL_GIF,
+                                            'image/gif'),
+            })
+        self.assertEqual(len(calls), 2)
+        post = Post.objects.get(text='Пост с картинкой')
+        stored = [name for name in
+                  os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+                  if name.startswith('retry')]
+        self.assertEqual(stored, [os.path.basename(post.image.name)])
+
+    @override_settings(DB_LOCKED_RETRY_DELAY=0, DB_LOCKED_RETRIES=1)
+    def test_failed_create_removes_upload(self):
+        """Если пост так и не сохранился, картинка удаляется."""
+        with mock.patch.object(
+                Post, '_do_insert',
+                side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                self.author.post(reverse('posts:post_create'), data={
+                    'text': 'Пост с картинкой',
+                    'image': SimpleUploadedFile('failed.gif', SMALL_GIF,
+                                                'image/gif'),
+                })
+        self.assertFalse([
+            name for name in
+            os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+            if name.startswith('failed')])
@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import importer
+
+from ..models import (Comment, Follow, Group, Post, TimelineEntry, User,
+                      UserStats)
+
+
+class ImportDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        return path
+
+    def write_jsonl(self, name, records):
+        return self.write(name, ''.join(
+            json.dumps(record, ensure_ascii=False) + '\n'
+            for record in records))
+
+    def import_data(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_data', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_jsonl(self):
+        """Группы, посты, комментарии и подписки грузятся пачками."""
+        path = self.write_jsonl('data.jsonl', [
+            {'model': 'group', 'slug': 'cats', 'title': 'Коты',
+             'description': 'Про котов'},
+            {'model': 'post', 'id': 100, 'author': 'author',
+             'group': 'cats', 'text': 'Архивный пост',
+             'pub_date': '2015-05-01T10:00:00'},
+            {'model': 'comment', 'post': 100, 'author': 'reader',
+             'text': 'Комментарий'},
+            {'model': 'follow', 'user': 'reader', 'author': 'author'},
+        ])
+        out, err = self.import_data(path, '--chunk-size', '2')
+        self.assertEqual(err, '')
+        self.assertIn('с ошибками: 0', out)
+        post = Post.objects.get(id=100)
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+    def test_import_csv_with_model_option(self):
+        path = self.write('posts.csv', 'author,text\nauthor,Из CSV\n')
+        self.import_data(path, '--model', 'post')
+        self.assertTrue(Post.objects.filter(text='Из CSV').exists())
+
+    def test_error_rows_are_reported(self):
+        """Строки с ошибками пропускаются и попадают в отчёт."""
+        path = self.write('data.jsonl', '\n'.join([
+            json.dumps({'model': 'post', 'author': 'nobody', 'text': 'a'}),
+            json.dumps({'model': 'post', 'author': 'author', 'text': ''}),
+            json.dumps({'model': 'follow', 'user': 'author',
+                        'author': 'author'}),
+            json.dumps({'model': 'comment', 'post': 404, 'author': 'author',
+                        'text': 'a'}),
+            '{broken',
+            json.dumps({'model': 'post', 'author': 'author', 'text': 'Да'}),
+        ]))
+        errors = os.path.join(self.directory, 'errors.jsonl')
+        out, err = self.import_data(path, '--errors', errors)
+        self.assertIn('с ошибками: 5', out)
+        self.assertIn(f'{path}:1:', err)
+        with open(errors, encoding='utf-8') as stream:
+            lines = [json.loads(line)['line'] for line in stream]
+        self.assertEqual(sorted(lines), [1, 2, 3, 4, 5])
+        self.assertEqual(list(Post.objects.values_list('text', flat=True)),
+                         ['Да'])
+
+    def test_create_users(self):
+        path = self.write_jsonl('data.jsonl', [
+            {'model': 'post', 'author': 'newcomer', 'text': 'Привет'},
+        ])
+        self.import_data(path, '--create-users')
+        newcomer = User.objects.get(username='newcomer')
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertEqual(newcomer.stats.posts_count, 1)
+
+    def test_follow_count_ignores_duplicates(self):
+        """В отчёт попадают только действительно добавленные подписки."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        path = self.write_jsonl('data.jsonl', [
+            {'model': 'follow', 'user': 'reader', 'author': 'author'},
+            {'model': 'follow', 'user': 'author', 'author': 'reader'},
+            {'model': 'follow', 'user': 'author', 'author': 'reader'},
+        ])
+        out, _ = self.import_data(path)
+        self.assertIn('follow: 1', out)
+        self.assertEqual(Follow.objects.count(), 2)
+
+    @mock.patch.object(importer, 'ID_BATCH_SIZE', 1)
+    def test_id_lookups_are_batched(self):
+        """Проверка id постов выполняется пачками по ID_BATCH_SIZE."""
+        taken = Post.objects.create(author=self.author, text='Уже есть')
+        path = self.write_jsonl('data.jsonl', [
+            {'model': 'post', 'id': taken.id, 'author': 'author',
+             'text': 'Дубль'},
+            {'model': 'post', 'id': taken.id + 1, 'author': 'author',
+             'text': 'Новый'},
+            {'model': 'comment', 'post': taken.id, 'author': 'reader',
+             'text': 'Первый'},
+            {'model': 'comment', 'post': taken.id + 1, 'author': 'reader',
+             'text': 'Второй'},
+        ])
+        out, _ = self.import_data(path)
+        self.assertIn('с ошибками: 1', out)
+        self.assertEqual(Comment.objects.count(), 2)
+        with self.assertNumQueries(3):
+            found = importer.existing_ids(Post.objects,
+                                          {taken.id, taken.id + 1, 0})
+        self.assertEqual(found, {taken.id, taken.id + 1})
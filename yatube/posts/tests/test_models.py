@@ -1,6 +1,10 @@
-from django.test import TestCase
+from datetime import timedelta
 
-from ..models import Group, Post, User
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -76,3 +80,93 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     group._meta.get_field(field).help_text, expected_value)
+
+
+class ChangeTrackingTest(TestCase):
+    """Время и номер изменения обновляются при любом способе записи."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.post = Post.objects.create(author=self.user, text='Пост',
+                                        group=self.group)
+        self.post.refresh_from_db()
+
+    def assertChanged(self, post, version):
+        post.refresh_from_db()
+        self.assertEqual(post.version, version)
+        self.assertGreater(post.updated_at, self.post.updated_at)
+
+    def test_new_rows_start_with_first_version(self):
+        comment = Comment.objects.create(post=self.post, author=self.user,
+                                         text='Комментарий')
+        for obj in (self.post, self.group, comment):
+            with self.subTest(model=type(obj).__name__):
+                self.assertEqual(obj.version, 1)
+                self.assertIsNotNone(obj.updated_at)
+
+    def test_save_increments_version(self):
+        """save() и save(update_fields) увеличивают версию в базе."""
+        post = Post.objects.get(pk=self.post.pk)
+        stale = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка'
+        post.save()
+        self.assertEqual(post.version, 2)
+        stale.text = 'Одновременная правка'
+        stale.save(update_fields=['text'])
+        self.assertChanged(stale, 3)
+
+    def test_queryset_update_is_tracked(self):
+        """update() и счётчики комментариев тоже отмечают изменение."""
+        Post.objects.filter(pk=self.post.pk).update(text='Правка')
+        self.assertChanged(Post.objects.get(pk=self.post.pk), 2)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        self.assertChanged(Post.objects.get(pk=self.post.pk), 3)
+
+    def test_admin_list_editable_is_tracked(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        client.post(reverse('admin:posts_post_changelist'), data={
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-0-id': str(self.post.pk),
+            'form-0-group': '',
+            '_save': 'Сохранить',
+        })
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIsNone(post.group)
+        self.assertChanged(post, 2)
+
+    def test_group_delete_touches_its_posts(self):
+        group = Group.objects.create(title='Группа', slug='other',
+                                     description='Описание')
+        Post.objects.filter(pk=self.post.pk).update(group=group, version=1)
+        group.delete()
+        self.assertChanged(Post.objects.get(pk=self.post.pk), 2)
+
+    def test_changed_since(self):
+        """changed_since отдаёт изменённые строки в порядке изменения."""
+        old = Post.objects.create(author=self.user, text='Старый')
+        Post.objects.filter(pk=old.pk).update(
+            updated_at=timezone.now() - timedelta(days=1))
+        since = timezone.now() - timedelta(hours=1)
+        self.assertQuerysetEqual(Post.objects.changed_since(since),
+                                 [self.post.pk], lambda post: post.pk)
+        old.text = 'Исправленный'
+        old.save()
+        self.assertEqual(
+            list(Post.objects.changed_since(since)
+                 .values_list('pk', flat=True)),
+            [self.post.pk, old.pk])
+        self.assertFalse(Group.objects.changed_since(timezone.now()))
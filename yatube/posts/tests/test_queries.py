@@ -0,0 +1,145 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import timeline
+from posts.utils import COMMENTS_ON_PAGE, POST_ON_PAGE
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class FeedQueriesTests(TestCase):
+    """Число запросов на страницу ленты не зависит от числа постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(POST_ON_PAGE + 2):
+            author = User.objects.create_user(
+                username=f'author_{i}',
+                first_name='Имя',
+                last_name=f'Фамилия {i}',
+            )
+            Follow.objects.create(user=cls.user, author=author)
+            Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=author,
+                group=cls.group,
+            )
+        cls.author = author
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_guest_feed_query_budget(self):
+        """Ленты для гостя укладываются в фиксированный бюджет запросов."""
+        pages = {
+            reverse('posts:index'): 3,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 4,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 3,
+            reverse('posts:index') + '?cursor=': 1,
+        }
+        for url, budget in pages.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    self.guest_client.get(url)
+
+    def test_follow_feed_query_budget(self):
+        """Лента подписок укладывается в фиксированный бюджет запросов."""
+        timeline.celebrity_ids()
+        with self.assertNumQueries(5):
+            self.authorized_client.get(reverse('posts:follow_index'))
+
+
+class FollowQueriesTests(TestCase):
+    """Число запросов при подписке, отписке и просмотре профиля."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        timeline.celebrity_ids()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.follow_url = reverse('posts:profile_follow',
+                                  kwargs={'username': self.author})
+        self.unfollow_url = reverse('posts:profile_unfollow',
+                                    kwargs={'username': self.author})
+
+    def test_follow_query_budget(self):
+        """Подписка — одна вставка, повторная не дублирует запись."""
+        with self.assertNumQueries(13):
+            self.authorized_client.get(self.follow_url)
+        with self.assertNumQueries(9):
+            self.authorized_client.get(self.follow_url)
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+
+    def test_unfollow_query_budget(self):
+        """Отписка — одно удаление без предварительной проверки."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.assertNumQueries(9):
+            self.authorized_client.get(self.unfollow_url)
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+
+    def test_profile_query_budget(self):
+        """Статус подписки в профиле — один запрос по индексу."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.assertNumQueries(6):
+            response = self.authorized_client.get(
+                reverse('posts:profile', kwargs={'username': self.author}))
+        self.assertTrue(response.context['following'])
+
+
+class CommentQueriesTests(TestCase):
+    """Комментарии выводятся страницами, автор — в том же запросе."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='Тестовый пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, text=f'Комментарий {i}',
+                    author=User.objects.create_user(username=f'user_{i}'))
+            for i in range(COMMENTS_ON_PAGE + 5))
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_post_detail_renders_first_page(self):
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_ON_PAGE)
+        self.assertEqual(comments[0].text,
+                         f'Комментарий {COMMENTS_ON_PAGE + 4}')
+        self.assertContains(response, comments.next_cursor)
+
+    def test_comments_fragment_returns_next_page(self):
+        first = self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}))
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(
+                url, {'cursor': first.context['comments'].next_cursor})
+        data = response.json()
+        self.assertIsNone(data['next'])
+        self.assertEqual(data['html'].count('class="media mb-4"'), 5)
+        self.assertIn('Комментарий 0', data['html'])
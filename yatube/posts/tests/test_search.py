@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, User
+from ..utils import POST_ON_PAGE
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author,
+                                       text='Заметки о путешествиях')
+        cls.other = Post.objects.create(author=cls.author,
+                                        text='Рецепт пирога')
+        Comment.objects.create(post=cls.other, author=cls.author,
+                               text='Взял с собой в путешествие')
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def found(self, query):
+        return list(self.search(query).context['page_obj'])
+
+    def test_search_finds_posts_and_comments(self):
+        """Пост выше поста, найденного по комментарию."""
+        self.assertEqual(self.found('путешеств'), [self.post, self.other])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Индекс обновляется при изменении и удалении текста."""
+        other = Post.objects.get(pk=self.other.pk)
+        other.text = 'Рецепт торта'
+        other.save()
+        self.assertEqual(self.found('торта'), [other])
+        self.assertEqual(self.found('пирога'), [])
+        self.other.comments.all().delete()
+        self.assertEqual(self.found('путешеств'), [self.post])
+        Post.objects.filter(pk=self.post.pk).update(text='Другое')
+        self.assertEqual(self.found('путешеств'), [])
+
+    def test_recency_breaks_ties(self):
+        """При равной релевантности свежий пост выше."""
+        old = Post.objects.create(author=self.author, text='Кот')
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=365))
+        new = Post.objects.create(author=self.author, text='Кот')
+        self.assertEqual(self.found('кот'), [new, old])
+
+    def test_query_operators_are_ignored(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.found('"путешеств* -('),
+                         [self.post, self.other])
+        self.assertEqual(self.found(''), [])
+
+    def test_pagination_keeps_query(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Кот {i}')
+            for i in range(POST_ON_PAGE + 1))
+        response = self.search('кот')
+        self.assertEqual(len(response.context['page_obj']), POST_ON_PAGE)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82&amp;page=2')
+        response = self.search('кот', page=2)
+        self.assertEqual(len(response.context['page_obj']), 1)
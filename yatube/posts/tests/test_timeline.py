@@ -0,0 +1,122 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import timeline
+from posts.utils import POST_ON_PAGE
+
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.old_post = Post.objects.create(author=cls.author,
+                                           text='Старый пост')
+        Post.objects.create(author=cls.other, text='Чужой пост')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow_page(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """После подписки в ленту попадают прошлые посты автора."""
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.assertEqual(self.follow_page(), [self.old_post])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.other, post=post).exists())
+        self.assertEqual(self.follow_page(), [post, self.old_post])
+
+    def test_unfollow_trims_timeline(self):
+        """После отписки посты автора убираются из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.follow_page(), [])
+
+    @mock.patch.object(timeline, 'FANOUT_LIMIT', 0)
+    def test_celebrity_posts_are_read_on_demand(self):
+        """Посты популярных авторов не раскладываются, а читаются из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.clear()
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.follow_page(), [post, self.old_post])
+
+    @mock.patch.object(timeline, 'FANOUT_LIMIT', 1)
+    def test_former_celebrity_posts_are_materialized(self):
+        """Посты, написанные «звездой», попадают в ленты после отписок."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        cache.clear()
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        with self.settings(BACKGROUND_WORKERS=0):
+            Follow.objects.get(user=self.other, author=self.author).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        cache.clear()
+        self.assertEqual(self.follow_page(), [post, self.old_post])
+
+    def test_pages_follow_cursor(self):
+        """Лента листается курсором, страницы не пересекаются."""
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(POST_ON_PAGE)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        first = self.reader_client.get(
+            reverse('posts:follow_index')).context['page_obj']
+        self.assertEqual(list(first), posts[::-1])
+        self.assertFalse(first.has_previous())
+        second = self.reader_client.get(
+            reverse('posts:follow_index')
+            + f'?cursor={first.next_cursor}').context['page_obj']
+        self.assertEqual(list(second), [self.old_post])
+        self.assertFalse(second.has_next())
+        self.assertTrue(second.has_previous())
+
+    def test_page_is_read_from_timeline_index(self):
+        """Записи ленты читаются по индексу без сортировки."""
+        entries = timeline.TimelinePaginator(self.reader).ordered(
+            TimelineEntry.objects.filter(user=self.reader), None,
+            timeline.ENTRY_ORDERING).values_list(*timeline.ENTRY_ORDERING)
+        sql, params = entries[:POST_ON_PAGE].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('timeline_user_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    @mock.patch.object(timeline, 'TIMELINE_LIMIT', 2)
+    def test_timeline_is_capped(self):
+        """В ленте хранятся только TIMELINE_LIMIT самых новых записей."""
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(2)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=self.reader)
+                .values_list('post', flat=True)),
+            {post.id for post in posts})
@@ -1,19 +1,28 @@
+import base64
 import shutil
 import tempfile
 from http import HTTPStatus
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models.sql.compiler import SQLCompiler
+from django.db.utils import ConnectionHandler
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.utils import POST_ON_PAGE
+from core import routers
+from posts import feed_cache
+from posts.utils import POST_ON_PAGE, CursorPage, CursorPaginator
 
 from ..models import Follow, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+REPLICA = 'replica_0'
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -54,6 +63,7 @@ class ViewsTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.author = Client()
         self.author.force_login(self.user)
         self.authorized_client = Client()
@@ -183,14 +193,33 @@ class ViewsTests(TestCase):
             text='Текст для проверки кеширования главной страницы',
             group=self.group,
         )
-        post_del = Post.objects.get(id=post_new.id)
-        response = self.author.get(reverse('posts:index'))
-        post_del.delete()
-        response_cached = self.author.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response_cached = self.guest_client.get(reverse('posts:index'))
         self.assertEqual(response.content, response_cached.content)
-        cache.clear()
-        response_cached = self.author.get(reverse('posts:index'))
-        self.assertNotEqual(response.content, response_cached.content)
+        Post.objects.get(id=post_new.id).delete()
+        response_changed = self.guest_client.get(reverse('posts:index'))
+        self.assertNotEqual(response.content, response_changed.content)
+        self.assertNotIn(post_new, response_changed.context['page_obj'])
+
+    def test_cache_feeds_invalidated_on_edit(self):
+        """Правка поста сбрасывает кеш лент, в которые он входит."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.post.author}),
+        )
+        for page in pages:
+            self.guest_client.get(page)
+        self.author.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Изменённый текст', 'group': self.group.id},
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.guest_client.get(page)
+                self.assertEqual(
+                    response.context['page_obj'][0].text, 'Изменённый текст')
 
     def test_follow_for_guest(self):
         """Проверка подписки для гостя"""
@@ -261,6 +290,7 @@ class PaginatorViewsTests(TestCase):
             )
 
     def setUp(self):
+        cache.clear()
         self.author = Client()
         self.author_post = PaginatorViewsTests.user
         self.author.force_login(self.author_post)
@@ -289,3 +319,126 @@ class PaginatorViewsTests(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 response = self.author.get(reverse_name + '?page=2')
                 self.assertEqual(len(response.context.get('page_obj')), 2)
+
+    def test_cursor_pages_contain_records(self):
+        """Курсорная пагинация: переход вперёд и назад без COUNT(*)."""
+        response_list = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username})
+        )
+        for reverse_name in response_list:
+            with self.subTest(reverse_name=reverse_name):
+                first = self.author.get(reverse_name + '?cursor=')
+                page_obj = first.context.get('page_obj')
+                self.assertIsInstance(page_obj, CursorPage)
+                self.assertEqual(len(page_obj), POST_ON_PAGE)
+                self.assertFalse(page_obj.has_previous())
+                second = self.author.get(
+                    reverse_name + f'?cursor={page_obj.next_cursor}')
+                second_page = second.context.get('page_obj')
+                self.assertEqual(len(second_page), 2)
+                self.assertFalse(second_page.has_next())
+                back = self.author.get(
+                    reverse_name
+                    + f'?cursor={second_page.previous_cursor}')
+                self.assertEqual(list(back.context.get('page_obj')),
+                                 list(page_obj))
+
+    def test_cursor_links_keep_query(self):
+        """Ссылки курсорной пагинации сохраняют остальные параметры."""
+        response = self.author.get(reverse('posts:index') + '?cursor=&q=кот')
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(
+            response, f'href="?cursor={next_cursor}&amp;q=%D0%BA%D0%BE%D1%82"')
+
+    def test_cursor_with_bad_value_is_rejected(self):
+        """Курсор с некорректной датой считается битым."""
+        paginator = CursorPaginator(Post.objects.all(), POST_ON_PAGE)
+        cursor = base64.urlsafe_b64encode(b'n|not-a-date|1').decode()
+        self.assertIsNone(paginator.decode_cursor(cursor))
+
+    def test_cursor_page_skips_count_query(self):
+        """Курсорная страница читается одним запросом без COUNT(*)."""
+        paginator = CursorPaginator(Post.objects.all(), POST_ON_PAGE)
+        with CaptureQueriesContext(connection) as queries:
+            paginator.get_page('')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+
+    def test_invalid_pages_are_not_cached(self):
+        """Некорректные и лишние номера страниц не попадают в кеш."""
+        index = reverse('posts:index')
+        cursor = CursorPaginator(Post.objects.all(), POST_ON_PAGE)
+        past_end = cursor.encode_cursor(Post.objects.order_by('id')[0],
+                                        'n')
+        prefix = feed_cache.PAGE_KEY.split('{')[0]
+        with mock.patch.object(feed_cache.cache, 'set') as cache_set:
+            for query in ('?page=abc', '?page=0', '?page=99',
+                          '?cursor=@@@', f'?cursor={past_end}'):
+                with self.subTest(query=query):
+                    self.author.get(index + query)
+        self.assertFalse([call for call in cache_set.call_args_list
+                          if call[0][0].startswith(prefix)])
+
+    def test_page_key_uses_validated_number(self):
+        """Первая страница без номера и с номером — одна запись кеша."""
+        guest = Client()
+        guest.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            guest.get(reverse('posts:index') + '?page=01')
+
+    def test_feed_version_bumped_again_on_commit(self):
+        """Версия ленты меняется ещё раз после фиксации транзакции."""
+        version, = feed_cache.get_versions(feed_cache.INDEX_FEED)
+        with mock.patch.object(feed_cache.transaction,
+                               'on_commit') as on_commit:
+            feed_cache.bump(feed_cache.INDEX_FEED)
+        bumped, = feed_cache.get_versions(feed_cache.INDEX_FEED)
+        self.assertNotEqual(bumped, version)
+        on_commit.call_args[0][0]()
+        self.assertNotIn(feed_cache.get_versions(feed_cache.INDEX_FEED)[0],
+                         (version, bumped))
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_caches_are_filled_from_primary(self):
+        """Вечные записи кеша не читаются с отстающей реплики."""
+        real_connection = ConnectionHandler.__getitem__
+        real_execute = SQLCompiler.execute_sql
+        reads = []
+
+        def connection_for(handler, alias):
+            # Своей базы у реплики в тестах нет: запросы к ней видны
+            # по псевдониму, а выполняются в основной.
+            if alias == REPLICA:
+                alias = routers.PRIMARY
+            return real_connection(handler, alias)
+
+        def execute_sql(compiler, *args, **kwargs):
+            reads.append((compiler.query.model, compiler.using))
+            return real_execute(compiler, *args, **kwargs)
+
+        guest = Client()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        with mock.patch.object(ConnectionHandler, '__getitem__',
+                               connection_for), \
+                mock.patch.object(SQLCompiler, 'execute_sql', execute_sql):
+            for url in urls:
+                with self.subTest(url=url):
+                    reads.clear()
+                    response = guest.get(url)
+                    self.assertEqual(len(response.context['page_obj']),
+                                     POST_ON_PAGE)
+                    self.assertNotIn((Post, REPLICA), reads)
+                    self.assertIn((Post, routers.PRIMARY), reads)
+        # Остальные чтения по-прежнему идут в реплику.
+        self.assertIn((User, REPLICA), reads)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Некорректный курсор отдаёт первую страницу."""
+        response = self.author.get(reverse('posts:index') + '?cursor=@@@')
+        self.assertEqual(
+            len(response.context.get('page_obj')), POST_ON_PAGE)
@@ -0,0 +1,44 @@
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import background
+
+# Миниатюра картинки поста в лентах и на странице поста.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def _thumbnail_options(source):
+    """Опции sorl-thumbnail, дополненные так же, как в get_thumbnail."""
+    backend = default.backend
+    options = dict(THUMBNAIL_OPTIONS)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def ready_thumbnail(image):
+    """Готовая миниатюра из хранилища sorl или None, если её ещё нет."""
+    source = ImageFile(image)
+    name = default.backend._get_thumbnail_filename(
+        source, THUMBNAIL_GEOMETRY, _thumbnail_options(source))
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def generate(name):
+    """Создаёт миниатюру картинки и записывает её в хранилище sorl."""
+    get_thumbnail(name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+
+
+def schedule(image):
+    """Ставит создание миниатюры в фоновую очередь."""
+    if image and image.name:
+        background.run(f'thumbnail:{image.name}', generate, image.name)
@@ -0,0 +1,194 @@
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db.models import Q
+
+from core import tasks
+
+from . import background
+from .models import Follow, Post, TimelineEntry, UserStats
+from .utils import CURSOR_PREVIOUS, POST_ON_PAGE, CursorPaginator
+
+# Авторы с большим числом подписчиков не раскладываются по лентам,
+# их посты подмешиваются в ленту при чтении.
+FANOUT_LIMIT = 1000
+# Сколько последних постов автора добавляется в ленту при подписке.
+BACKFILL_LIMIT = 1000
+# Сколько самых новых записей хранится в ленте пользователя.
+TIMELINE_LIMIT = 1000
+# Поля ключа курсора в записях ленты.
+ENTRY_ORDERING = ('pub_date', 'post_id')
+CELEBRITIES_CACHE_KEY = 'posts:timeline:celebrities'
+CELEBRITIES_CACHE_TIMEOUT = 60
+
+
+def celebrity_ids():
+    """Авторы, посты которых читаются из ленты без раскладки."""
+    authors = cache.get(CELEBRITIES_CACHE_KEY)
+    if authors is None:
+        authors = list(
+            UserStats.objects.filter(followers_count__gt=FANOUT_LIMIT)
+            .values_list('user', flat=True)
+        )
+        cache.set(CELEBRITIES_CACHE_KEY, authors, CELEBRITIES_CACHE_TIMEOUT)
+    return authors
+
+
+def is_celebrity(author_id):
+    return author_id in celebrity_ids()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers),
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('id', 'pub_date')[:BACKFILL_LIMIT]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts),
+        ignore_conflicts=True,
+    )
+    cap(user_id)
+
+
+def left_celebrities(author_id):
+    """Автор после отписки только что перестал быть «звездой».
+
+    Его посты, написанные без раскладки, ещё не лежат в лентах.
+    """
+    count = (UserStats.objects.filter(user_id=author_id)
+             .values_list('followers_count', flat=True).first())
+    if count is None or count > FANOUT_LIMIT:
+        return False
+    return count == FANOUT_LIMIT or author_id in celebrity_ids()
+
+
+def overflow(user_id):
+    """Ключ (pub_date, post_id) первой записи сверх TIMELINE_LIMIT или None.
+
+    Читает TIMELINE_LIMIT записей индекса ленты, не трогая посты.
+    """
+    entries = (TimelineEntry.objects.filter(user_id=user_id)
+               .order_by('-pub_date', '-post_id')
+               .values_list(*ENTRY_ORDERING))
+    edge = list(entries[TIMELINE_LIMIT:TIMELINE_LIMIT + 1])
+    return edge[0] if edge else None
+
+
+def cap(user_id):
+    """Оставляет в ленте только TIMELINE_LIMIT самых новых записей."""
+    edge = overflow(user_id)
+    if edge is None:
+        return
+    pub_date, post_id = edge
+    TimelineEntry.objects.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, post_id__lte=post_id),
+        user_id=user_id,
+    ).delete()
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def follow_feed(user):
+    """Лента подписок: материализованные посты плюс посты «звёзд».
+
+    Выборка для подсчёта; страницы читает TimelinePaginator.
+    """
+    posts = Post.objects.feed()
+    celebrities = celebrity_ids()
+    if not celebrities:
+        return posts.filter(timeline_entries__user=user)
+    return posts.filter(
+        Q(id__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=Follow.objects.filter(
+            user=user, author__in=celebrities).values('author'))
+    )
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорные страницы ленты подписок по индексу её записей.
+
+    Ключи страницы читаются из индекса (user, -pub_date, -post) без
+    сортировки, ключи постов «звёзд» — отдельным запросом, после
+    слияния посты загружаются по id. Страница — обычный Page, как у
+    остальных лент, с курсорами соседних страниц.
+    """
+
+    def __init__(self, user, per_page=POST_ON_PAGE):
+        super().__init__(follow_feed(user), per_page)
+        self.user = user
+        self.num_pages = 1
+
+    def fetch(self, decoded, limit):
+        keys = list(self.ordered(TimelineEntry.objects.filter(user=self.user),
+                                 decoded, ENTRY_ORDERING)
+                    .values_list(*ENTRY_ORDERING)[:limit])
+        celebrities = celebrity_ids()
+        if celebrities:
+            authors = Follow.objects.filter(
+                user=self.user, author__in=celebrities).values('author')
+            keys += self.ordered(Post.objects.filter(author__in=authors),
+                                 decoded).values_list(*self.ordering)[:limit]
+        backwards = decoded is not None and decoded[0] == CURSOR_PREVIOUS
+        keys = sorted(set(keys), reverse=not backwards)[:limit]
+        posts = Post.objects.feed().in_bulk([post_id for _, post_id in keys])
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
+
+    def make_page(self, rows, next_cursor, previous_cursor):
+        # Номер и число страниц задают has_previous() и has_next() Page.
+        number = 1 if previous_cursor is None else 2
+        self.num_pages = number + (next_cursor is not None)
+        page = Page(rows, number, self)
+        page.next_cursor = next_cursor
+        page.previous_cursor = previous_cursor
+        return page
+
+
+def follow_page(user, cursor=None):
+    """Страница ленты подписок; первая заодно проверяет длину ленты."""
+    if not cursor and overflow(user.id) is not None:
+        background.run(f'timeline:cap:{user.id}', cap, user.id,
+                       priority=tasks.LOW)
+    return TimelinePaginator(user).get_page(cursor)
+
+
+def refill(author_ids, batch_size=1000):
+    """Раскладывает последние посты авторов по лентам их подписчиков.
+
+    Для массовой загрузки, которая обходит сигналы.
+    """
+    cache.delete(CELEBRITIES_CACHE_KEY)
+    celebrities = set(celebrity_ids())
+    for author_id in author_ids:
+        if author_id in celebrities:
+            continue
+        posts = list(Post.objects.filter(author_id=author_id)
+                     .values_list('id', 'pub_date')[:BACKFILL_LIMIT])
+        followers = list(Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True))
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post_id=post_id,
+                           pub_date=pub_date)
+             for user_id in followers for post_id, pub_date in posts),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        for user_id in followers:
+            cap(user_id)
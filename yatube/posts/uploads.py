@@ -0,0 +1,116 @@
+import io
+import os
+import tempfile
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps
+
+from core import db, tasks
+
+from . import background, variants
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл по частям, не держа её в памяти.
+
+    Файл больше POST_IMAGE_MAX_SIZE пропускается, а имя его поля
+    попадает в request.rejected_uploads.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        self.received = 0
+        super().new_file(field_name, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            self.request.rejected_uploads.add(self.field_name)
+            raise SkipFile()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def streaming_uploads(view):
+    """Подключает к view ограниченную потоковую загрузку файлов.
+
+    Обработчики загрузки меняются до того, как CSRF-проверка прочитает
+    тело запроса, поэтому сама проверка выполняется уже внутри.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.rejected_uploads = set()
+        request.upload_handlers = [
+            LimitedTemporaryFileUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+def shrink(name):
+    """Уменьшает слишком большую картинку и пересохраняет её без
+    метаданных под тем же именем."""
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        if getattr(image, 'is_animated', False):
+            return
+        image_format = image.format
+        too_wide = max(image.size) > settings.POST_IMAGE_MAX_SIDE
+        too_heavy = default_storage.size(name) > settings.POST_IMAGE_MAX_STORED
+        if not (too_wide or too_heavy):
+            return
+        # Метаданные не сохраняются, поэтому поворот из EXIF
+        # применяется к самим пикселям, иначе фото с телефона ляжет боком.
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((settings.POST_IMAGE_MAX_SIDE,
+                         settings.POST_IMAGE_MAX_SIDE))
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        image.save(output, format=image_format, optimize=True,
+                   **({'quality': 85} if image_format == 'JPEG' else {}))
+    # Новая версия пишется рядом и подменяет файл одним rename:
+    # читатели не застанут файл отсутствующим или недописанным.
+    path = default_storage.path(name)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path),
+                                     delete=False) as temporary:
+        temporary.write(output.getvalue())
+    os.chmod(temporary.name, default_storage.file_permissions_mode or 0o644)
+    os.replace(temporary.name, path)
+
+
+def process(name):
+    shrink(name)
+    variants.generate(name)
+
+
+def save_retrying(post):
+    """Сохраняет пост с новой картинкой, повторяя только запись в базу.
+
+    Файл записывается в хранилище один раз до транзакции: повтор
+    целиком сохранял бы его заново, а временный файл загрузки после
+    первой попытки уже перемещён. Если запись так и не удалась,
+    файл удаляется.
+    """
+    image = post.image
+    stored = bool(image) and not image._committed
+    if stored:
+        image.save(image.name, image.file, save=False)
+    try:
+        db.call_retrying(post.save)
+    except Exception:
+        if stored:
+            image.delete(save=False)
+        raise
+
+
+def schedule(image):
+    """Ставит обработку загруженной картинки в фоновую очередь."""
+    if image and image.name:
+        background.run(f'upload:{image.name}', process, image.name,
+                       priority=tasks.HIGH)
@@ -1,10 +1,159 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 
 POST_ON_PAGE = 10
+COMMENTS_ON_PAGE = 20
+COMMENT_FIELDS = ('text', 'created', 'post', 'author__username')
+COMMENT_ORDERING = ('created', 'id')
+CURSOR_PARAM = 'cursor'
+CURSOR_ORDERING = ('pub_date', 'id')
+CURSOR_SEPARATOR = '|'
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации: без номера и общего числа страниц."""
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Cursor page {self.previous_cursor}:{self.next_cursor}>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator:
+    """Пагинация по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Каждая страница читается одним запросом по индексу: выбирается
+    на одну запись больше, чем нужно, чтобы узнать о следующей странице.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, ordering=CURSOR_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = ordering
+
+    @cached_property
+    def count(self):
+        """Общее число записей; запрос выполняется только по обращению."""
+        return self.object_list.count()
 
+    def encode_cursor(self, obj, direction):
+        values = [str(getattr(obj, name)) for name in self.ordering]
+        raw = CURSOR_SEPARATOR.join([direction] + values)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
 
-def page_paginator(request, objects):
+    def decode_cursor(self, cursor):
+        """Возвращает (направление, значения) или None для битого курсора."""
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        direction, *values = raw.split(CURSOR_SEPARATOR)
+        if (direction not in (CURSOR_NEXT, CURSOR_PREVIOUS)
+                or len(values) != len(self.ordering)):
+            return None
+        model = self.object_list.model
+        try:
+            values = [model._meta.get_field(name).to_python(value)
+                      for name, value in zip(self.ordering, values)]
+        except (ValidationError, ValueError, TypeError):
+            return None
+        if None in values:
+            return None
+        return direction, values
+
+    def _after(self, values, lookup, fields=None):
+        """Условие «строго за курсором» для составного ключа."""
+        (first, second), (first_value, second_value) = (
+            fields or self.ordering), values
+        return (Q(**{f'{first}__{lookup}': first_value})
+                | Q(**{first: first_value,
+                       f'{second}__{lookup}': second_value}))
+
+    def ordered(self, queryset, decoded, fields=None):
+        """queryset за курсором в порядке чтения страницы.
+
+        fields — поля ключа в queryset, если они называются иначе,
+        чем ordering.
+        """
+        fields = fields or self.ordering
+        descending = [f'-{name}' for name in fields]
+        if decoded is None:
+            return queryset.order_by(*descending)
+        direction, values = decoded
+        if direction == CURSOR_NEXT:
+            return queryset.filter(
+                self._after(values, 'lt', fields)).order_by(*descending)
+        return queryset.filter(
+            self._after(values, 'gt', fields)).order_by(*fields)
+
+    def fetch(self, decoded, limit):
+        """До limit записей за курсором в порядке чтения."""
+        return list(self.ordered(self.object_list, decoded)[:limit])
+
+    def make_page(self, rows, next_cursor, previous_cursor):
+        return CursorPage(rows, self, next_cursor=next_cursor,
+                          previous_cursor=previous_cursor)
+
+    def get_page(self, cursor):
+        """Страница, начинающаяся за курсором; пустой курсор — первая."""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        direction = CURSOR_NEXT if decoded is None else decoded[0]
+        rows = self.fetch(decoded, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == CURSOR_PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = bool(rows), has_more
+        else:
+            has_next, has_previous = has_more, decoded is not None
+        return self.make_page(
+            rows,
+            next_cursor=(self.encode_cursor(rows[-1], CURSOR_NEXT)
+                         if has_next and rows else None),
+            previous_cursor=(self.encode_cursor(rows[0], CURSOR_PREVIOUS)
+                             if has_previous and rows else None),
+        )
+
+
+def page_paginator(request, objects, count=None):
+    """Постраничный вывод; при параметре ?cursor= — курсорный.
+
+    Известное заранее число записей (count) избавляет от COUNT(*).
+    """
+    if CURSOR_PARAM in request.GET:
+        paginator = CursorPaginator(objects, POST_ON_PAGE)
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
     paginator = Paginator(objects, POST_ON_PAGE)
+    if count is not None:
+        paginator.count = count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def comment_page(post, cursor=None):
+    """Страница комментариев поста, новые сверху, автор — в том же запросе."""
+    comments = (post.comments.select_related('author')
+                .only(*COMMENT_FIELDS))
+    paginator = CursorPaginator(comments, COMMENTS_ON_PAGE,
+                                ordering=COMMENT_ORDERING)
+    return paginator.get_page(cursor)
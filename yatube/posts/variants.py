@@ -0,0 +1,93 @@
+import io
+import json
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import feed_cache
+from .models import Post
+
+# Ширины вариантов картинки; пропорции — как у миниатюры 960x339.
+VARIANT_WIDTHS = (320, 640, 960)
+VARIANT_RATIO = 339 / 960
+# Форматы от самого компактного к самому совместимому; последний
+# используется в <img src> для браузеров без поддержки <picture>.
+VARIANT_FORMATS = (
+    ('AVIF', 'avif', 'image/avif', {'quality': 60}),
+    ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 4}),
+    ('JPEG', 'jpg', 'image/jpeg', {'quality': 85, 'optimize': True,
+                                   'progressive': True}),
+)
+VARIANTS_DIR = 'posts/variants/'
+
+
+def supported_formats():
+    """Форматы, которые умеет сохранять установленный Pillow."""
+    Image.init()
+    return [variant_format for variant_format in VARIANT_FORMATS
+            if variant_format[0] in Image.SAVE]
+
+
+def build(name):
+    """Создаёт варианты картинки и возвращает их описание."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    variants = []
+    for width in VARIANT_WIDTHS:
+        height = round(width * VARIANT_RATIO)
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for image_format, extension, mime, options in supported_formats():
+            output = io.BytesIO()
+            resized.save(output, format=image_format, **options)
+            variant_name = default_storage.save(
+                f'{VARIANTS_DIR}{stem}_{width}.{extension}',
+                ContentFile(output.getvalue()))
+            variants.append({
+                'name': variant_name,
+                'type': mime,
+                'width': width,
+                'height': height,
+            })
+    return variants
+
+
+def generate(name):
+    """Создаёт варианты и записывает их описание в посты с картинкой."""
+    metadata = json.dumps(build(name), separators=(',', ':'))
+    posts = Post.objects.filter(image=name)
+    posts.update(image_variants=metadata)
+    for post in posts.only('author', 'group'):
+        feed_cache.bump(*feed_cache.post_feeds(post))
+
+
+def picture(post):
+    """Источники <picture> по сохранённому описанию вариантов.
+
+    Возвращает None, если вариантов ещё нет; файлы не проверяются.
+    """
+    if not post.image_variants:
+        return None
+    variants = json.loads(post.image_variants)
+    sources = {}
+    for variant in variants:
+        sources.setdefault(variant['type'], []).append(
+            '{} {}w'.format(default_storage.url(variant['name']),
+                            variant['width']))
+    fallback_type = variants[-1]['type']
+    largest = max((variant for variant in variants
+                   if variant['type'] == fallback_type),
+                  key=lambda variant: variant['width'])
+    return {
+        'sources': [
+            {'type': mime, 'srcset': ', '.join(srcset)}
+            for mime, srcset in sources.items() if mime != fallback_type
+        ],
+        'srcset': ', '.join(sources[fallback_type]),
+        'src': default_storage.url(largest['name']),
+        'width': largest['width'],
+        'height': largest['height'],
+    }
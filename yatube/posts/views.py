@@ -1,75 +1,144 @@
 from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 
+from core.db import retry_locked
+
+from . import (conditional, counters, feed_cache, search as post_search,
+               timeline, uploads)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import page_paginator
+from .utils import CURSOR_PARAM, comment_page
 
 
+@conditional.cache_policy
 def index(request):
     """Главная страница"""
     template = 'posts/index.html'
-    post_list = Post.objects.all()
+    state = conditional.for_user(request, conditional.feed_state(
+        Post.objects.all(), feed_cache.INDEX_FEED))
+
+    def render_page():
+        post_list = Post.objects.feed()
+        context = {
+            'page_obj': feed_cache.cached_page(
+                request, feed_cache.INDEX_FEED, post_list),
+        }
+        return render(request, template, context)
+    return conditional.respond(request, state, render_page)
+
+
+def search(request):
+    """Поиск по постам и комментариям"""
+    template = 'posts/search.html'
+    query = request.GET.get(post_search.QUERY_PARAM, '').strip()
     context = {
-        'page_obj': page_paginator(request, post_list),
+        'query': query,
+        'page_obj': post_search.search_page(request, query),
+        'page_query': post_search.page_query(query),
     }
     return render(request, template, context)
 
 
+@conditional.cache_policy
 def group_posts(request, slug):
     """Cтраница сообщества"""
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    context = {
-        'group': group,
-        'page_obj': page_paginator(request, group.groups.all()),
-    }
-    return render(request, template, context)
+    feed = feed_cache.group_feed(group.id)
+    state = conditional.for_user(
+        request, conditional.feed_state(group.groups.all(), feed))
+
+    def render_page():
+        context = {
+            'group': group,
+            'page_obj': feed_cache.cached_page(
+                request, feed, group.groups.feed()),
+        }
+        return render(request, template, context)
+    return conditional.respond(request, state, render_page)
 
 
+@conditional.cache_policy
 def profile(request, username):
     """Страница с информацией об авторе"""
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    stats = counters.stats_for(author)
     following = ((request.user.id is not None)
                  and Follow.objects.filter(user=request.user,
                                            author=author).exists())
-    context = {
-        'author': author,
-        'page_obj': page_paginator(request, author.posts.all()),
-        'following': following
-    }
-    return render(request, template, context)
-
-
+    feed = feed_cache.profile_feed(author.id)
+    state = conditional.for_user(
+        request, conditional.feed_state(author.posts.all(), feed),
+        stats.posts_count, stats.followers_count, stats.following_count,
+        following)
+
+    def render_page():
+        context = {
+            'author': author,
+            'page_obj': feed_cache.cached_page(
+                request, feed, author.posts.feed(), count=stats.posts_count),
+            'following': following
+        }
+        return render(request, template, context)
+    return conditional.respond(request, state, render_page)
+
+
+@conditional.cache_policy
 def post_detail(request, post_id):
     """Страница с информацией поста"""
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
-    post_num = post.author.posts.count()
-    form = CommentForm(request.POST or None)
-    comments = post.comments.all()
-    context = {
-        'post': post,
-        'post_num': post_num,
-        'form': form,
-        'comments': comments
-    }
-    return render(request, template, context)
+    state = conditional.for_user(request, conditional.post_state(post_id))
+    if state is None:
+        raise Http404
+
+    def render_page():
+        post = get_object_or_404(
+            Post.objects.select_related('author__stats', 'group'),
+            id=post_id)
+        post_num = counters.stats_for(post.author).posts_count
+        form = CommentForm(request.POST or None)
+        comments = comment_page(post, request.GET.get(CURSOR_PARAM))
+        context = {
+            'post': post,
+            'post_num': post_num,
+            'form': form,
+            'comments': comments
+        }
+        return render(request, template, context)
+    return conditional.respond(request, state, render_page)
+
+
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент в JSON"""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments = comment_page(post, request.GET.get(CURSOR_PARAM))
+    return JsonResponse({
+        'html': render_to_string('posts/includes/comments.html',
+                                 {'comments': comments}, request),
+        'next': comments.next_cursor,
+    })
 
 
 @login_required
+@uploads.streaming_uploads
 def post_create(request):
     """Переход на страницу создания поста"""
     template = 'posts/create_post.html'
-    if request.method == 'POST':
-        form = PostForm(request.POST)
-        if form.is_valid():
-            post = form.save(commit=False)
-            post.author = request.user
-            form.save()
-            return redirect('posts:profile', request.user)
-    form = PostForm()
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        rejected_uploads=request.rejected_uploads)
+    if form.is_valid():
+        post = form.save(commit=False)
+        post.author = request.user
+        uploads.save_retrying(post)
+        uploads.schedule(post.image)
+        return redirect('posts:profile', request.user)
     context = {
         'is_edit': False,
         'form': form,
@@ -78,6 +147,7 @@ def post_create(request):
 
 
 @login_required
+@uploads.streaming_uploads
 def post_edit(request, post_id):
     """Переход на страницу редактирования поста"""
     template = 'posts/create_post.html'
@@ -87,9 +157,15 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post)
+        instance=post,
+        rejected_uploads=request.rejected_uploads)
     if form.is_valid():
-        form.save()
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            form.instance.image_variants = ''
+        post = form.save()
+        if image_changed:
+            uploads.schedule(post.image)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'is_edit': True,
@@ -100,6 +176,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_locked
 def add_comment(request, post_id):
     """Добавление комментария к посту на странице детальных записей"""
     post = get_object_or_404(Post, id=post_id)
@@ -115,20 +192,24 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     """Страница постов интересных авторов(мои подписки)"""
-    user = request.user
-    posts = Post.objects.filter(author__following__user=user)
-    context = {'page_obj': page_paginator(request, posts)}
+    context = {'page_obj': timeline.follow_page(
+        request.user, request.GET.get(CURSOR_PARAM))}
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@retry_locked
 def profile_follow(request, username):
     """Подписаться на автора"""
     author = get_object_or_404(User, username=username)
     user = request.user
-    follow = Follow.objects.filter(user=user, author=author)
-    if user != author and not follow.exists():
-        follow = Follow.objects.create(user=user, author=author)
+    if user != author:
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=user, author=author)
+        except IntegrityError:
+            # Уже подписан: повторная подписка ничего не меняет.
+            pass
     return redirect('posts:follow_index')
 
 
@@ -136,7 +217,5 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     """Отписаться от автора"""
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(user=request.user, author=author)
-    if follow.exists():
-        follow.delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
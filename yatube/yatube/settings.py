@@ -23,8 +23,8 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'v$ivu1q40oonpqtnkpa+nwk+$mj&#*kkopd$od1%(0djwg^c6)'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-# DEBUG = False
-DEBUG = True
+# YATUBE_DEBUG=0 включает боевую конфигурацию (в том числе кеш шаблонов).
+DEBUG = os.getenv('YATUBE_DEBUG', '1') == '1'
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 ALLOWED_HOSTS = [
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -52,7 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,12 +67,22 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Без DEBUG шаблоны читаются и разбираются один раз на процесс;
+# с DEBUG — на каждый запрос, чтобы правки были видны сразу.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -87,11 +100,77 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Cache
+# Общий для всех процессов кеш задаётся переменными окружения:
+# YATUBE_CACHE_BACKEND — locmem (по умолчанию, свой у каждого процесса),
+# file (каталог на диске) или shm (каталог в разделяемой памяти /dev/shm);
+# YATUBE_CACHE_LOCATION — каталог для file/shm;
+# YATUBE_CACHE_KEY_PREFIX и YATUBE_CACHE_VERSION — префикс и версия ключей,
+# смена версии сбрасывает весь кеш при выкладке.
+# На file/shm add и incr не атомарны: общие счётчики попаданий кеша
+# и замеров запросов там приблизительные.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'shm': ('django.core.cache.backends.filebased.FileBasedCache',
+            '/dev/shm/yatube_cache'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.getenv('YATUBE_CACHE_BACKEND', 'locmem')]
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('YATUBE_CACHE_LOCATION', CACHE_LOCATION),
+        'KEY_PREFIX': os.getenv('YATUBE_CACHE_KEY_PREFIX', 'yatube'),
+        'VERSION': int(os.getenv('YATUBE_CACHE_VERSION', 1)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('YATUBE_CACHE_MAX_ENTRIES', 10000)),
+        },
     }
 }
+# Сколько секунд общий кеш (CDN, прокси) хранит страницы для гостей;
+# браузер каждый раз перепроверяет страницу по ETag.
+ANONYMOUS_CACHE_SECONDS = int(os.getenv('YATUBE_ANONYMOUS_CACHE_SECONDS', 30))
+# Замеры запросов (core.perf): как часто процесс сбрасывает их в общий
+# кеш, сколько SQL хранить на запрос и с какого времени (мс) запрос
+# считается медленным и пишется в журнал; 0 — не писать.
+PERF_FLUSH_EVERY = 50
+PERF_SQL_LIMIT = 100
+PERF_SLOW_REQUEST_MS = int(os.getenv('YATUBE_PERF_SLOW_REQUEST_MS', 500))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.perf': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+# Как часто процесс сбрасывает счётчики попаданий кеша в общий кеш.
+CACHE_STATS_FLUSH_EVERY = 100
+
+# Потоки фоновой обработки картинок; 0 — обрабатывать сразу в запросе.
+BACKGROUND_WORKERS = int(os.getenv('YATUBE_BACKGROUND_WORKERS', 2))
+# YATUBE_BACKGROUND_QUEUE=1 переносит фоновую работу в таблицу задач
+# (core.tasks): она переживает перезапуск и выполняется командой
+# run_tasks в TASKS_PROCESSES процессах. Неудачная задача повторяется
+# через TASKS_RETRY_DELAY секунд, удваиваясь, до TASKS_MAX_ATTEMPTS.
+BACKGROUND_QUEUE = os.getenv('YATUBE_BACKGROUND_QUEUE', '0') == '1'
+TASKS_PROCESSES = int(os.getenv('YATUBE_TASKS_PROCESSES', 2))
+TASKS_BATCH_SIZE = 20
+TASKS_MAX_ATTEMPTS = 3
+TASKS_RETRY_DELAY = 10
+TASKS_LEASE = 600
+
+# Картинки постов: предельный размер загрузки, предельное число пикселей
+# по заголовку файла и размеры, больше которых картинка уменьшается.
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_MAX_STORED = 2 * 1024 * 1024
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -100,8 +179,41 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переиспользуется запросами потока до CONN_MAX_AGE
+        # секунд; timeout — сколько SQLite ждёт снятия блокировки.
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'timeout': float(os.getenv('YATUBE_DB_TIMEOUT', 5)),
+        },
     }
 }
+# Реплики только для чтения: YATUBE_DB_REPLICAS — пути к копиям базы
+# через запятую. Для проверки на одной машине достаточно скопировать
+# db.sqlite3 в replica.sqlite3 и указать её здесь.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(','))):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(DATABASES['default'], NAME=path,
+                            TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает из основной базы.
+REPLICA_PIN_SECONDS = int(os.getenv('YATUBE_REPLICA_PIN_SECONDS', 10))
+
+# Применяются к каждому новому соединению (core.db): WAL не даёт
+# писателю блокировать читателей, synchronous=NORMAL в WAL безопасен
+# для целостности и не ждёт fsync на каждой транзакции.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Повторы пишущих представлений при «database is locked».
+DB_LOCKED_RETRIES = 3
+DB_LOCKED_RETRY_DELAY = 0.05
 
 
 # Password validation
@@ -141,7 +253,17 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Представления только ставят письма в очередь (core.mail); отправляет
+# их команда send_queued_mail через MAIL_QUEUE_BACKEND пачками по
+# MAIL_QUEUE_BATCH_SIZE. Неудачная попытка повторяется через
+# MAIL_QUEUE_RETRY_DELAY секунд, удваиваясь, до MAIL_QUEUE_MAX_ATTEMPTS.
+EMAIL_BACKEND = 'core.mail.QueueBackend'
+MAIL_QUEUE_BACKEND = os.getenv(
+    'YATUBE_MAIL_BACKEND', 'django.core.mail.backends.filebased.EmailBackend')
+MAIL_QUEUE_BATCH_SIZE = 50
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+MAIL_QUEUE_RETRY_DELAY = 60
+MAIL_QUEUE_LEASE = 300
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
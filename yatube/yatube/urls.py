@@ -12,6 +12,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('staff/', include('core.urls', namespace='core')),
     path('about/', include('about.urls', namespace='about')),
 ]
 if settings.DEBUG: